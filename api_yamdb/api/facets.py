@@ -0,0 +1,174 @@
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from api import nginx_cache
+from reviews.models import Category, Genre, GenreTitle, Title, TitleYearCount
+
+FACETS_URL = f'{nginx_cache.TITLES_URL}facets/'
+VERSION_KEY = 'facets-version'
+
+_pending = threading.local()
+
+
+def recount(genre_ids=None, category_ids=None, years=None):
+    """Пересчитывает счётчики фасетов; None означает все значения."""
+    for model, related, field, ids in (
+        (Category, Title, 'category', category_ids),
+        (Genre, GenreTitle, 'genre', genre_ids),
+    ):
+        if ids is not None and not ids:
+            continue
+        queryset = model.objects.all()
+        if ids is not None:
+            queryset = queryset.filter(pk__in=ids)
+        counts = related.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(count=Count('pk')).values('count')
+        queryset.update(titles_count=Coalesce(Subquery(counts), 0))
+
+    titles = Title.objects.filter(year__isnull=False)
+    year_counts = TitleYearCount.objects.all()
+    if years is not None:
+        years = [year for year in years if year is not None]
+        if not years:
+            return
+        titles = titles.filter(year__in=years)
+        year_counts = year_counts.filter(year__in=years)
+    # Параллельные пересчёты не мешают друг другу: новые годы вставляются
+    # с пропуском конфликтов, а счётчики обновляются одним UPDATE.
+    counts = Title.objects.filter(year=OuterRef('year')).order_by().values(
+        'year'
+    ).annotate(count=Count('pk')).values('count')
+    with transaction.atomic():
+        TitleYearCount.objects.bulk_create(
+            (
+                TitleYearCount(year=year, titles_count=count)
+                for year, count in titles.order_by().values_list(
+                    'year'
+                ).annotate(Count('pk'))
+            ),
+            ignore_conflicts=True,
+        )
+        year_counts.update(titles_count=Coalesce(Subquery(counts), 0))
+        year_counts.filter(titles_count=0).delete()
+
+
+def schedule_recount(genre_ids=(), category_ids=(), years=()):
+    """Пересчитывает затронутые счётчики после коммита транзакции.
+
+    Изменения за одну транзакцию собираются вместе, как в
+    nginx_cache.refresh. Вместо множества id можно передать None, тогда
+    пересчитываются все значения измерения.
+    """
+    connection = transaction.get_connection()
+    scheduled = any(func is flush for _, func in connection.run_on_commit)
+    if not scheduled:
+        _pending.changes = {'genres': set(), 'categories': set(),
+                            'years': set()}
+    for name, ids in (
+        ('genres', genre_ids), ('categories', category_ids), ('years', years)
+    ):
+        if ids is None or _pending.changes[name] is None:
+            _pending.changes[name] = None
+        else:
+            _pending.changes[name].update(ids)
+    if not scheduled:
+        transaction.on_commit(flush)
+
+
+def flush():
+    changes = _pending.changes
+    recount(changes['genres'], changes['categories'], changes['years'])
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+    nginx_cache.refresh([FACETS_URL])
+
+
+def count_unfiltered(using):
+    return {
+        'genres': list(Genre.objects.using(using).filter(
+            titles_count__gt=0
+        ).values_list('id', 'titles_count')),
+        'categories': list(Category.objects.using(using).filter(
+            titles_count__gt=0
+        ).values_list('id', 'titles_count')),
+        'years': list(TitleYearCount.objects.using(using).values_list(
+            'year', 'titles_count'
+        )),
+    }
+
+
+def count_filtered(titles, using):
+    """Счётчики по отфильтрованным произведениям одним запросом UNION ALL."""
+    title_ids = titles.order_by().values('pk')
+    titles = Title.objects.using(using).filter(pk__in=title_ids)
+    parts = [
+        queryset.order_by().values(field).annotate(
+            facet=Value(name, output_field=models.CharField()),
+            count=Count('pk'),
+        ).values_list('facet', field, 'count')
+        for name, queryset, field in (
+            ('genres', GenreTitle.objects.using(using).filter(
+                title_id__in=title_ids
+            ), 'genre_id'),
+            ('categories', titles, 'category_id'),
+            ('years', titles.filter(year__isnull=False), 'year'),
+        )
+    ]
+    counts = {'genres': [], 'categories': [], 'years': []}
+    for facet, key, count in parts[0].union(*parts[1:], all=True):
+        counts[facet].append((key, count))
+    return counts
+
+
+def build(counts, using):
+    genres = dict(counts['genres'])
+    categories = dict(counts['categories'])
+    return {
+        'genres': [
+            {'name': name, 'slug': slug, 'count': genres[pk]}
+            for pk, name, slug in Genre.objects.using(using).filter(
+                pk__in=genres
+            ).values_list('pk', 'name', 'slug')
+        ],
+        'categories': [
+            {'name': name, 'slug': slug, 'count': categories[pk]}
+            for pk, name, slug in Category.objects.using(using).filter(
+                pk__in=categories
+            ).values_list('pk', 'name', 'slug')
+        ],
+        'years': [
+            {'year': year, 'count': count}
+            for year, count in sorted(counts['years'])
+        ],
+    }
+
+
+def get_facets(titles, params):
+    """Фасеты каталога для фильтра params с кешированием.
+
+    Без фильтра счётчики читаются из таблиц, которые поддерживаются при
+    изменении каталога, с фильтром считаются одним агрегирующим
+    запросом. Ключ кеша включает версию каталога из общего кеша
+    воркеров, поэтому после изменений фасеты пересчитываются во всех
+    процессах, не дожидаясь истечения TTL. Фасеты строятся по основной
+    базе: иначе отстающая реплика попала бы в кеш под новой версией.
+    """
+    digest = hashlib.sha256(repr(sorted(params.items())).encode()).hexdigest()
+    key = f'facets:{cache.get(VERSION_KEY, "")}:{digest}'
+    facets = cache.get(key)
+    if facets is None:
+        using = DEFAULT_DB_ALIAS
+        if params:
+            counts = count_filtered(titles, using)
+        else:
+            counts = count_unfiltered(using)
+        facets = build(counts, using)
+        cache.set(key, facets, settings.FACETS_CACHE_SECONDS)
+    return facets
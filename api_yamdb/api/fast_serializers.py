@@ -0,0 +1,112 @@
+from collections import defaultdict
+
+from rest_framework import serializers
+
+from reviews.models import GenreTitle
+
+
+class ValuesSerializer:
+    """Быстрый сериализатор строк, полученных через .values_list().
+
+    Описание полей задаётся один раз в атрибуте fields в виде
+    (имя в ответе, путь в .values_list(), преобразователь). Порядок полей
+    и преобразователи повторяют соответствующий ModelSerializer, поэтому
+    результат рендеринга совпадает с ним байт в байт.
+    """
+
+    fields = ()
+
+    def __init__(self):
+        self.keys = tuple(name for name, _, _ in self.fields)
+        self.lookups = tuple(lookup for _, lookup, _ in self.fields)
+        self.converters = tuple(
+            (index, converter)
+            for index, (_, _, converter) in enumerate(self.fields)
+            if converter is not None
+        )
+
+    def prepare(self, queryset):
+        return queryset.values_list(*self.lookups)
+
+    def to_row(self, values):
+        if self.converters:
+            values = list(values)
+            for index, converter in self.converters:
+                if values[index] is not None:
+                    values[index] = converter(values[index])
+        return dict(zip(self.keys, values))
+
+    def serialize(self, rows):
+        to_row = self.to_row
+        return [to_row(values) for values in rows]
+
+
+def datetime_converter():
+    return serializers.DateTimeField().to_representation
+
+
+class TitleValuesSerializer(ValuesSerializer):
+    """Быстрая версия TitleSerializer."""
+
+    fields = (
+        ('id', 'id', None),
+        ('name', 'name', None),
+        ('year', 'year', None),
+        ('rating', 'rating', float),
+        ('description', 'description', None),
+        ('category_name', 'category__name', None),
+        ('category_slug', 'category__slug', None),
+    )
+
+    def get_genres(self, title_ids):
+        genres = defaultdict(list)
+        genre_titles = GenreTitle.objects.filter(
+            title_id__in=title_ids,
+        ).order_by('genre__name').values_list(
+            'title_id', 'genre__name', 'genre__slug',
+        )
+        for title_id, name, slug in genre_titles:
+            genres[title_id].append({'name': name, 'slug': slug})
+        return genres
+
+    def build(self, rows, genres):
+        result = []
+        to_row = self.to_row
+        for values in rows:
+            row = to_row(values)
+            category = {
+                'name': row.pop('category_name'),
+                'slug': row.pop('category_slug'),
+            }
+            row['genre'] = genres.get(row['id'], [])
+            row['category'] = category
+            result.append(row)
+        return result
+
+    def serialize(self, rows):
+        rows = list(rows)
+        return self.build(rows, self.get_genres([row[0] for row in rows]))
+
+
+class ReviewValuesSerializer(ValuesSerializer):
+    """Быстрая версия ReviewSerializer."""
+
+    fields = (
+        ('id', 'id', None),
+        ('text', 'text', None),
+        ('author', 'author__username', None),
+        ('pub_date', 'pub_date', datetime_converter()),
+        ('score', 'score', None),
+    )
+
+
+class CommentValuesSerializer(ValuesSerializer):
+    """Быстрая версия CommentSerializer."""
+
+    fields = (
+        ('id', 'id', None),
+        ('author', 'author__username', None),
+        ('text', 'text', None),
+        ('pub_date', 'pub_date', datetime_converter()),
+        ('review', 'review_id', None),
+    )
@@ -1,16 +1,54 @@
 import django_filters
+from django.db.models import Count
 
-from reviews.models import Title
+from reviews.models import GenreTitle, Title
+
+GENRE_MODES = (
+    ('any', 'any'),
+    ('all', 'all'),
+)
+
+
+class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    pass
 
 
 class TitleFilter(django_filters.FilterSet):
+    """Фильтр произведений.
+
+    genre и category принимают несколько slug через запятую. Жанры
+    проверяются подзапросом по GenreTitle (semi-join), а не JOIN, поэтому
+    произведения не дублируются и DISTINCT не нужен.
+    """
 
     name = django_filters.CharFilter(
         field_name='name', lookup_expr='icontains')
-    category = django_filters.CharFilter(field_name='category__slug')
-    genre = django_filters.CharFilter(field_name='genre__slug')
+    category = CharInFilter(field_name='category__slug')
+    genre = CharInFilter(method='filter_genre')
+    genre_mode = django_filters.ChoiceFilter(
+        choices=GENRE_MODES, method='filter_genre_mode')
     year = django_filters.NumberFilter(field_name='year')
+    year_min = django_filters.NumberFilter(
+        field_name='year', lookup_expr='gte')
+    year_max = django_filters.NumberFilter(
+        field_name='year', lookup_expr='lte')
+    rating_min = django_filters.NumberFilter(
+        field_name='rating', lookup_expr='gte')
+    rating_max = django_filters.NumberFilter(
+        field_name='rating', lookup_expr='lte')
 
     class Meta:
         model = Title
         fields = ['name', 'category', 'genre', 'year']
+
+    def filter_genre(self, queryset, name, value):
+        slugs = set(value)
+        titles = GenreTitle.objects.filter(genre__slug__in=slugs)
+        if self.form.cleaned_data.get('genre_mode') == 'all':
+            titles = titles.values('title_id').annotate(
+                genres_count=Count('genre_id'),
+            ).filter(genres_count=len(slugs))
+        return queryset.filter(id__in=titles.values('title_id'))
+
+    def filter_genre_mode(self, queryset, name, value):
+        return queryset
@@ -0,0 +1,107 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from api.fast_serializers import (CommentValuesSerializer,
+                                  ReviewValuesSerializer,
+                                  TitleValuesSerializer)
+from api.renderers import FastJSONRenderer
+from api.serializers import (CommentSerializer, ReviewSerializer,
+                             TitleSerializer)
+from reviews.models import Category, Comment, Genre, Review, Title, User
+
+
+class Command(BaseCommand):
+    """Микробенчмарк рендеринга страниц: ModelSerializer против .values().
+
+    Строки создаются в памяти, база данных не используется.
+    """
+
+    help = 'Сравнивает стоимость рендеринга строки двумя способами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        now = timezone.now()
+        author = User(id=1, username='author')
+        category = Category(id=1, name='Фильмы', slug='movie')
+        genres = [
+            Genre(id=1, name='Драма', slug='drama'),
+            Genre(id=2, name='Комедия', slug='comedy'),
+        ]
+        genre_values = [
+            {'name': genre.name, 'slug': genre.slug} for genre in genres
+        ]
+
+        titles, title_rows, title_genres = [], [], {}
+        reviews, review_rows = [], []
+        comments, comment_rows = [], []
+        for pk in range(1, rows + 1):
+            title = Title(
+                id=pk, name=f'Произведение {pk}', year=2000,
+                description='Описание', category=category,
+            )
+            title.rating = pk % 10 + 0.5
+            title._prefetched_objects_cache = {'genre': genres}
+            titles.append(title)
+            title_rows.append((
+                pk, title.name, 2000, title.rating, 'Описание',
+                category.name, category.slug,
+            ))
+            title_genres[pk] = genre_values
+            reviews.append(Review(
+                id=pk, text='Текст', author=author, pub_date=now, score=7,
+            ))
+            review_rows.append((pk, 'Текст', author.username, now, 7))
+            comments.append(Comment(
+                id=pk, author=author, text='Текст', pub_date=now,
+                review_id=1,
+            ))
+            comment_rows.append((pk, author.username, 'Текст', now, 1))
+
+        title_values = TitleValuesSerializer()
+        cases = (
+            (
+                'titles',
+                lambda: TitleSerializer(titles, many=True).data,
+                lambda: title_values.build(title_rows, title_genres),
+            ),
+            (
+                'reviews',
+                lambda: ReviewSerializer(reviews, many=True).data,
+                lambda: ReviewValuesSerializer().serialize(review_rows),
+            ),
+            (
+                'comments',
+                lambda: CommentSerializer(comments, many=True).data,
+                lambda: CommentValuesSerializer().serialize(comment_rows),
+            ),
+        )
+        for name, model_path, values_path in cases:
+            model_output, model_time = self.measure(
+                model_path, JSONRenderer(), options['repeat']
+            )
+            values_output, values_time = self.measure(
+                values_path, FastJSONRenderer(), options['repeat']
+            )
+            self.stdout.write(
+                f'{name}: ModelSerializer {model_time / rows * 1e6:.2f} '
+                f'мкс/строка, ValuesSerializer '
+                f'{values_time / rows * 1e6:.2f} мкс/строка, '
+                f'ускорение x{model_time / values_time:.1f}, '
+                f'вывод идентичен: {model_output == values_output}'
+            )
+
+    def measure(self, build, renderer, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            output = renderer.render(build())
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return output, best
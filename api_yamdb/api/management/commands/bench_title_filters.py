@@ -0,0 +1,90 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import QueryDict
+
+from api.filtres import TitleFilter
+from api.views import TitleViewSet
+from reviews.models import Category, Genre, GenreTitle, Title
+
+CASES = (
+    '',
+    'genre=drama',
+    'genre=drama,comedy',
+    'genre=drama,comedy&genre_mode=all',
+    'year_min=1990&year_max=2000',
+    'category=movie,book&year_min=1990',
+    'rating_min=7&rating_max=9',
+    'genre=drama,comedy&genre_mode=all&category=movie&rating_min=5',
+)
+
+
+class Command(BaseCommand):
+    """Бенчмарк фильтров произведений на большом каталоге.
+
+    Для каждого набора параметров выводит время первой страницы и
+    подсчёта, план запроса и проверяет отсутствие дублей.
+    """
+
+    help = 'Замеряет время и планы запросов TitleFilter.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--populate', type=int, default=0,
+            help='Сначала создать указанное число синтетических '
+                 'произведений (только для локальной БД).',
+        )
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--explain', action='store_true')
+
+    def handle(self, *args, **options):
+        if options['populate']:
+            self.populate(options['populate'])
+        for case in CASES:
+            queryset = TitleFilter(
+                QueryDict(case), queryset=TitleViewSet.queryset
+            ).qs
+            started = time.perf_counter()
+            ids = [
+                title.id for title in queryset[:options['page_size']]
+            ]
+            page_time = time.perf_counter() - started
+            started = time.perf_counter()
+            count = queryset.count()
+            count_time = time.perf_counter() - started
+            if len(ids) != len(set(ids)):
+                self.stderr.write(f'{case}: в выдаче есть дубли!')
+            self.stdout.write(
+                f'{case or "<без фильтров>"}: {count} шт., страница '
+                f'{page_time * 1000:.1f} мс, count {count_time * 1000:.1f} мс'
+            )
+            if options['explain']:
+                self.stdout.write(queryset.explain())
+
+    def populate(self, size):
+        categories = [
+            Category.objects.get_or_create(
+                slug=slug, defaults={'name': slug}
+            )[0]
+            for slug in ('movie', 'book', 'music')
+        ]
+        genres = [
+            Genre.objects.get_or_create(slug=slug, defaults={'name': slug})[0]
+            for slug in ('drama', 'comedy', 'thriller', 'fantasy', 'docs')
+        ]
+        titles = Title.objects.bulk_create(
+            Title(
+                name=f'Произведение {index}',
+                year=random.randint(1950, 2020),
+                category=random.choice(categories),
+            )
+            for index in range(size)
+        )
+        if titles[0].pk is None:
+            titles = Title.objects.order_by('-id')[:size]
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title=title, genre=genre)
+            for title in titles
+            for genre in random.sample(genres, random.randint(1, 3))
+        )
@@ -0,0 +1,282 @@
+import random
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Min
+
+from reviews.models import (ADMIN, Category, ConfirmationCode, Genre, Title,
+                            User)
+
+USER_PREFIX = 'load_test_'
+DEFAULT_MIX = 'browse=70,comments=15,review=10,admin=5'
+PERCENTILES = (50, 95, 99)
+
+
+class LoadClient:
+    """Один виртуальный клиент: своя сессия, генератор и статистика.
+
+    Каждый сценарий - короткая цепочка запросов, как у настоящего клиента.
+    Время ответа пишется под шаблоном маршрута, а не конкретным URL.
+    """
+
+    def __init__(self, base_url, catalog, tokens, admin_token, seed):
+        self.base_url = base_url.rstrip('/') + '/api/v1'
+        self.catalog = catalog
+        self.tokens = tokens
+        self.admin_token = admin_token
+        self.random = random.Random(seed)
+        self.session = requests.Session()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def request(self, method, route, path, token=None, **kwargs):
+        headers = {}
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        started = time.perf_counter()
+        try:
+            response = self.session.request(
+                method, self.base_url + path, headers=headers,
+                timeout=30, **kwargs
+            )
+            status = response.status_code
+        except requests.RequestException:
+            response, status = None, 0
+        self.latencies[f'{method} {route}'].append(
+            time.perf_counter() - started
+        )
+        self.statuses[f'{method} {route}'][status] += 1
+        if response is not None and status == 200:
+            return response.json()
+        return None
+
+    def title_filters(self):
+        catalog = self.catalog
+        params = {'page': self.random.choices((1, 2, 3), (6, 3, 1))[0]}
+        if catalog['categories'] and self.random.random() < 0.5:
+            params['category'] = self.random.choice(catalog['categories'])
+        if catalog['genres'] and self.random.random() < 0.5:
+            count = min(len(catalog['genres']), self.random.randint(1, 2))
+            params['genre'] = ','.join(
+                self.random.sample(catalog['genres'], count)
+            )
+            if self.random.random() < 0.3:
+                params['genre_mode'] = 'all'
+        if catalog['years'][0] is not None and self.random.random() < 0.3:
+            params['year_min'] = self.random.randint(*catalog['years'])
+        if self.random.random() < 0.2:
+            params['rating_min'] = self.random.randint(1, 9)
+        return params
+
+    def browse(self):
+        page = self.request(
+            'GET', '/titles/', '/titles/', params=self.title_filters()
+        )
+        if not page or not page['results']:
+            return
+        title_id = self.random.choice(page['results'])['id']
+        self.request('GET', '/titles/{id}/', f'/titles/{title_id}/')
+        if self.random.random() < 0.5:
+            self.request(
+                'GET', '/titles/{id}/overview/',
+                f'/titles/{title_id}/overview/',
+            )
+
+    def review(self):
+        title_id = self.random.choice(self.catalog['titles'])
+        self.request(
+            'POST', '/titles/{id}/reviews/', f'/titles/{title_id}/reviews/',
+            token=self.random.choice(self.tokens),
+            json={'text': 'Нагрузочный тест', 'score': self.random.randint(
+                1, 10
+            )},
+        )
+
+    def comments(self):
+        title_id = self.random.choice(self.catalog['titles'])
+        reviews = self.request(
+            'GET', '/titles/{id}/reviews/', f'/titles/{title_id}/reviews/'
+        )
+        if not reviews or not reviews['results']:
+            return
+        path = (
+            f'/titles/{title_id}/reviews/'
+            f'{self.random.choice(reviews["results"])["id"]}/comments/'
+        )
+        route = '/titles/{id}/reviews/{id}/comments/'
+        self.request('GET', route, path)
+        self.request(
+            'POST', route, path, token=self.random.choice(self.tokens),
+            json={'text': 'Нагрузочный тест'},
+        )
+
+    def admin(self):
+        title_id = self.random.choice(self.catalog['titles'])
+        title = self.request('GET', '/titles/{id}/', f'/titles/{title_id}/')
+        if title:
+            self.request(
+                'PATCH', '/titles/{id}/', f'/titles/{title_id}/',
+                token=self.admin_token,
+                json={'description': title['description']},
+            )
+
+    def run(self, scenarios, weights, deadline):
+        while time.monotonic() < deadline:
+            getattr(self, self.random.choices(scenarios, weights)[0])()
+        return self
+
+
+class Command(BaseCommand):
+    """Нагрузочный тест запущенного сервера смесью клиентских сценариев.
+
+    Сценарии: browse - анонимный просмотр каталога с фильтрами TitleFilter,
+    review - публикация отзывов, comments - чтение и запись комментариев,
+    admin - правка произведений администратором. Тестовые пользователи
+    получают JWT через /auth/token/ и удаляются после прогона вместе со
+    своими отзывами. Если пользователи с такими именами уже есть, команда
+    не запускается. Сервер должен работать с той же базой данных.
+    """
+
+    help = 'Нагружает сервер смесью сценариев и выводит статистику.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument(
+            '--mix', default=DEFAULT_MIX,
+            help='Веса сценариев browse, review, comments и admin.',
+        )
+        parser.add_argument('--duration', type=float, default=30)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--users', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        mix = self.parse_mix(options['mix'])
+        catalog = self.get_catalog()
+        if User.objects.filter(username__startswith=USER_PREFIX).exists():
+            raise CommandError(
+                f'Уже есть пользователи с именами {USER_PREFIX}*: удалите '
+                f'их или используйте другую базу данных.'
+            )
+        try:
+            with transaction.atomic():
+                users = [
+                    User.objects.create(
+                        username=f'{USER_PREFIX}{index}',
+                        email=f'{USER_PREFIX}{index}@example.ru',
+                    )
+                    for index in range(options['users'])
+                ]
+                admin = User.objects.create(
+                    username=f'{USER_PREFIX}admin',
+                    email=f'{USER_PREFIX}admin@example.ru', role=ADMIN,
+                )
+        except IntegrityError:
+            raise CommandError(
+                'Не удалось создать тестовых пользователей: имя или email '
+                'уже заняты.'
+            )
+        try:
+            tokens = self.obtain_tokens(
+                options['url'],
+                ConfirmationCode.objects.issue_many(users + [admin]),
+            )
+            admin_token = tokens.pop(admin)
+            started = time.monotonic()
+            deadline = started + options['duration']
+            with ThreadPoolExecutor(options['concurrency']) as executor:
+                clients = list(executor.map(
+                    lambda index: LoadClient(
+                        options['url'], catalog, list(tokens.values()),
+                        admin_token, options['seed'] + index,
+                    ).run(list(mix), list(mix.values()), deadline),
+                    range(options['concurrency']),
+                ))
+            elapsed = time.monotonic() - started
+        finally:
+            User.objects.filter(
+                pk__in=[user.pk for user in users + [admin]]
+            ).delete()
+        self.report(clients, elapsed)
+
+    def parse_mix(self, value):
+        mix = {}
+        for item in value.split(','):
+            name, _, weight = item.partition('=')
+            if name not in ('browse', 'review', 'comments', 'admin'):
+                raise CommandError(f'Неизвестный сценарий: {name}')
+            try:
+                mix[name] = float(weight)
+            except ValueError:
+                raise CommandError(f'Некорректный вес сценария: {item}')
+        return mix
+
+    def get_catalog(self):
+        titles = list(Title.objects.values_list('id', flat=True))
+        if not titles:
+            raise CommandError('Для нагрузочного теста нужны произведения.')
+        years = Title.objects.aggregate(Min('year'), Max('year'))
+        return {
+            'titles': titles,
+            'categories': list(Category.objects.values_list(
+                'slug', flat=True
+            )),
+            'genres': list(Genre.objects.values_list('slug', flat=True)),
+            'years': (years['year__min'], years['year__max']),
+        }
+
+    def obtain_tokens(self, base_url, codes):
+        tokens = {}
+        session = requests.Session()
+        url = base_url.rstrip('/') + '/api/v1/auth/token/'
+        for user, code in codes.items():
+            response = session.post(url, json={
+                'username': user.username, 'confirmation_code': code,
+            })
+            if response.status_code != 201:
+                raise CommandError(
+                    f'Не удалось получить токен: {response.status_code}'
+                )
+            tokens[user] = response.json()['token']
+        return tokens
+
+    def report(self, clients, elapsed):
+        latencies = defaultdict(list)
+        statuses = defaultdict(Counter)
+        for client in clients:
+            for route, values in client.latencies.items():
+                latencies[route] += values
+                statuses[route].update(client.statuses[route])
+        header = f'{"маршрут":<48}{"запросов":>9}{"rps":>8}{"5xx,%":>7}'
+        header += ''.join(f'{f"p{q}, мс":>10}' for q in PERCENTILES)
+        self.stdout.write(header)
+        for route in sorted(latencies):
+            values = sorted(latencies[route])
+            errors = sum(
+                count for status, count in statuses[route].items()
+                if status == 0 or status >= 500
+            )
+            line = (
+                f'{route:<48}{len(values):>9}{len(values) / elapsed:>8.1f}'
+                f'{errors * 100 / len(values):>7.1f}'
+            )
+            line += ''.join(
+                f'{percentile(values, q) * 1000:>10.1f}' for q in PERCENTILES
+            )
+            self.stdout.write(line)
+            self.stdout.write(
+                f'    коды ответов: {dict(sorted(statuses[route].items()))}'
+            )
+        total = sum(len(values) for values in latencies.values())
+        self.stdout.write(
+            f'Всего: {total} запросов за {elapsed:.1f} с, '
+            f'{total / elapsed:.1f} запросов в секунду'
+        )
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(len(values) * q / 100))]
@@ -0,0 +1,53 @@
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+STARTUP_CODE = (
+    'import time; started = time.perf_counter(); '
+    'from api_yamdb.wsgi import application; '
+    'from django.urls import get_resolver; get_resolver().url_patterns; '
+    'print(time.perf_counter() - started)'
+)
+
+
+class Command(BaseCommand):
+    """Замер холодного старта WSGI-приложения в отдельных процессах."""
+
+    help = 'Замеряет время загрузки приложения и самые тяжёлые модули.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--top', type=int, default=15)
+
+    def handle(self, *args, **options):
+        timings = [
+            float(self.run(STARTUP_CODE).stdout)
+            for _ in range(options['repeat'])
+        ]
+        self.stdout.write(
+            f'Старт приложения: минимум {min(timings) * 1000:.0f} мс, '
+            f'медиана {statistics.median(timings) * 1000:.0f} мс'
+        )
+        if options['top']:
+            self.stdout.write('Самые тяжёлые модули (собственное время):')
+            modules = []
+            importtime = self.run(STARTUP_CODE, '-X', 'importtime').stderr
+            for line in importtime.splitlines():
+                if not line.startswith('import time:') or 'self' in line:
+                    continue
+                own, _, name = line[len('import time:'):].split('|')
+                modules.append((int(own), name.strip()))
+            for own, name in sorted(modules, reverse=True)[:options['top']]:
+                self.stdout.write(f'{own / 1000:8.1f} мс  {name}')
+
+    def run(self, code, *flags):
+        return subprocess.run(
+            [sys.executable, *flags, '-c', code],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
@@ -0,0 +1,50 @@
+import io
+import pstats
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api_yamdb.profiling import list_profiles, profile_path
+
+
+class Command(BaseCommand):
+    """Просмотр профилей запросов, сохранённых ProfilingMiddleware."""
+
+    help = 'Выводит список профилей или сводку по одному из них.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile_id', nargs='?')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--sort', default='cumulative',
+            help='Сортировка pstats: cumulative, tottime, ncalls и т.д.',
+        )
+
+    def handle(self, *args, **options):
+        if options['profile_id']:
+            self.show(options['profile_id'], options)
+            return
+        for meta in list_profiles()[:options['limit']]:
+            created = datetime.fromtimestamp(meta['created'])
+            self.stdout.write(
+                f'{meta["id"]}  {created:%Y-%m-%d %H:%M:%S}  '
+                f'{meta["duration"] * 1000:8.1f} мс  {meta["status"]}  '
+                f'{meta["method"]} {meta["path"]}'
+            )
+
+    def show(self, profile_id, options):
+        report = io.StringIO()
+        try:
+            stats = pstats.Stats(
+                profile_path(profile_id, '.prof'), stream=report
+            )
+        except (OSError, ValueError):
+            raise CommandError('Профиль не найден.')
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(
+            options['limit']
+        )
+        self.stdout.write(report.getvalue())
+        self.stdout.write('Самые частые стеки (для flamegraph.pl):')
+        with open(profile_path(profile_id, '.collapsed')) as collapsed:
+            for _, line in zip(range(options['limit']), collapsed):
+                self.stdout.write(line.rstrip())
@@ -0,0 +1,91 @@
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, connection, transaction
+from rest_framework.test import APIClient
+
+from reviews.models import ArchivedReview, Review, Title, User
+
+
+class Command(BaseCommand):
+    """Стресс-тест параллельной записи отзывов на одно произведение.
+
+    Каждый из threads пользователей одновременно отправляет по два отзыва,
+    поэтому половина запросов попадает в гонку за уникальностью. Ожидается
+    ровно по одному 201 и одному 400 на пользователя, ни одного 500, и
+    агрегаты произведения, совпадающие с отзывами, включая архивные.
+    Запускать на PostgreSQL: SQLite не поддерживает параллельную запись.
+    Команда создаёт и удаляет своих пользователей и отзывы, поэтому её
+    стоит запускать только на одноразовой базе данных.
+    """
+
+    help = 'Параллельно отправляет отзывы на одно произведение.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('title_id', type=int)
+        parser.add_argument('--threads', type=int, default=16)
+
+    def handle(self, *args, **options):
+        try:
+            title = Title.objects.get(pk=options['title_id'])
+        except Title.DoesNotExist:
+            raise CommandError('Произведение не найдено.')
+        try:
+            with transaction.atomic():
+                users = [
+                    User.objects.create(
+                        username=f'stress_{index}',
+                        email=f'stress_{index}@example.ru',
+                    )
+                    for index in range(options['threads'])
+                ]
+        except IntegrityError:
+            raise CommandError(
+                'Пользователи stress_* уже существуют: команда создаёт '
+                'и удаляет своих пользователей сама.'
+            )
+        try:
+            statuses = self.post_reviews(title, users * 2)
+            title.refresh_from_db()
+            scores = [
+                score
+                for model in (Review, ArchivedReview)
+                for score in model.objects.visible().filter(
+                    title=title
+                ).values_list('score', flat=True)
+            ]
+            expected_count = len(scores)
+            expected_total = sum(scores)
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+        self.stdout.write(f'Ответы: {dict(sorted(statuses.items()))}')
+        consistent = (
+            title.reviews_count == expected_count
+            and title.score_total == expected_total
+        )
+        self.stdout.write(f'Агрегаты совпадают с отзывами: {consistent}')
+        if statuses.get(500) or not consistent:
+            raise CommandError('Стресс-тест не пройден.')
+
+    def post_reviews(self, title, users):
+        barrier = threading.Barrier(len(users))
+        url = f'/api/v1/titles/{title.pk}/reviews/'
+
+        def post(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            barrier.wait()
+            try:
+                return client.post(
+                    url, {'text': 'Стресс-тест', 'score': 7}
+                ).status_code
+            except Exception:
+                return 500
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=len(users)) as executor:
+            return Counter(executor.map(post, users))
@@ -1,4 +1,13 @@
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
+from django.utils.functional import cached_property
 from rest_framework import mixins, viewsets
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from api.streaming import stream_json
+from api_yamdb.db_router import keep_replica_reads
 
 
 class ListPatchDestroyViewSet(
@@ -8,3 +17,93 @@ class ListPatchDestroyViewSet(
     viewsets.GenericViewSet
 ):
     pass
+
+
+class FastListMixin:
+    """Быстрый вывод списка через ValuesSerializer вместо ModelSerializer.
+
+    Включается настройкой FAST_RENDERING и атрибутом values_serializer.
+    Страницы от STREAMING_PAGE_SIZE строк отдаются потоком: queryset
+    читается порциями, и память на запрос не зависит от размера страницы.
+    """
+
+    values_serializer = None
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_RENDERING or self.values_serializer is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.values_serializer.prepare(
+            self.filter_queryset(self.get_queryset())
+        )
+        if self.should_stream(request):
+            return self.get_streaming_response(queryset)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                self.values_serializer.serialize(page)
+            )
+        return Response(self.values_serializer.serialize(queryset))
+
+    def should_stream(self, request):
+        paginator = self.paginator
+        if not hasattr(paginator, 'paginate_queryset_lazily'):
+            return False
+        if request.accepted_renderer.format != 'json':
+            return False
+        size = paginator.get_requested_size(request)
+        return size is not None and size >= settings.STREAMING_PAGE_SIZE
+
+    def get_streaming_response(self, queryset):
+        page = self.paginator.paginate_queryset_lazily(
+            queryset, self.request, view=self, streaming=True
+        )
+        envelope = self.paginator.get_paginated_response(None).data
+        del envelope['results']
+        chunk_size = settings.STREAMING_CHUNK_SIZE
+        return StreamingHttpResponse(
+            keep_replica_reads(stream_json(
+                envelope, page.iterator(chunk_size=chunk_size),
+                self.values_serializer, chunk_size,
+            )),
+            content_type=self.request.accepted_renderer.media_type,
+        )
+
+
+class ParentMixin:
+    """Родительский объект вложенного маршрута, загружаемый раз за запрос.
+
+    parent_lookup_kwargs сопоставляет поля parent_queryset с kwargs URL,
+    поэтому вся цепочка (например, отзыв и его произведение) проверяется
+    одним запросом. Объект доступен представлению и разрешениям как
+    view.parent, а сериализаторам - в контексте под именем parent_name.
+    Если задан parent_archive_queryset, на чтение родитель ищется и в
+    архиве.
+    """
+
+    parent_queryset = None
+    parent_archive_queryset = None
+    parent_lookup_kwargs = {}
+    parent_name = 'parent'
+
+    @cached_property
+    def parent(self):
+        lookups = {
+            field: self.kwargs.get(kwarg)
+            for field, kwarg in self.parent_lookup_kwargs.items()
+        }
+        try:
+            return get_object_or_404(self.parent_queryset.all(), **lookups)
+        except Http404:
+            if (self.parent_archive_queryset is None
+                    or self.request.method not in SAFE_METHODS):
+                raise
+        return get_object_or_404(
+            self.parent_archive_queryset.all(), **lookups
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        # Без kwargs маршрута (например, при генерации схемы) родителя нет.
+        if self.kwargs:
+            context[self.parent_name] = self.parent
+        return context
@@ -0,0 +1,59 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.db import transaction
+
+TITLES_URL = '/api/v1/titles/'
+
+executor = ThreadPoolExecutor(max_workers=2)
+
+_pending = threading.local()
+
+
+def refresh(paths):
+    """Обновляет записи микрокеша nginx после коммита транзакции.
+
+    nginx кеширует анонимные GET каталога по URI; запрос с заголовком
+    X-Cache-Refresh, равным общему секрету NGINX_CACHE_REFRESH_TOKEN,
+    идёт мимо кеша и перезаписывает запись. Остальные варианты URL
+    (страницы, фильтры) устаревают сами по короткому TTL. Пути за одну
+    транзакцию собираются вместе.
+    """
+    if not settings.NGINX_CACHE_URL or not settings.NGINX_CACHE_REFRESH_TOKEN:
+        return
+    connection = transaction.get_connection()
+    if any(func is flush for _, func in connection.run_on_commit):
+        _pending.paths.update(paths)
+    else:
+        _pending.paths = set(paths)
+        transaction.on_commit(flush)
+
+
+def refresh_titles(title_ids):
+    paths = [TITLES_URL]
+    for title_id in title_ids:
+        title_url = f'{TITLES_URL}{title_id}/'
+        paths += [title_url, f'{title_url}reviews/']
+    refresh(paths)
+
+
+def flush():
+    paths = sorted(_pending.paths)
+    _pending.paths = set()
+    executor.submit(send_refresh, paths)
+
+
+def send_refresh(paths):
+    for path in paths:
+        try:
+            requests.get(
+                settings.NGINX_CACHE_URL + path,
+                headers={
+                    'X-Cache-Refresh': settings.NGINX_CACHE_REFRESH_TOKEN
+                },
+                timeout=settings.NGINX_CACHE_REFRESH_TIMEOUT,
+            )
+        except requests.RequestException:
+            pass
@@ -1,5 +1,108 @@
-from rest_framework.pagination import PageNumberPagination
+from django.conf import settings
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (CursorPagination, LimitOffsetPagination,
+                                       PageNumberPagination, _positive_int)
 
 
-class CategoryGenrePagination(PageNumberPagination):
+def get_max_size(streaming):
+    """Предел размера страницы; потоковые страницы не ограничены."""
+    return None if streaming else settings.STREAMING_PAGE_SIZE
+
+
+class StreamingPageNumberPagination(PageNumberPagination):
+    """Постраничная пагинация, умеющая отдавать страницу без загрузки.
+
+    paginate_queryset_lazily возвращает срез queryset, который можно
+    читать порциями; обычный paginate_queryset материализует его, поэтому
+    размер такой страницы ограничен STREAMING_PAGE_SIZE.
+    """
+
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request, streaming=False):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=get_max_size(streaming),
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_requested_size(self, request):
+        return self.get_page_size(request, streaming=True)
+
+    def paginate_queryset_lazily(self, queryset, request, view=None,
+                                 streaming=False):
+        page_size = self.get_page_size(request, streaming)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        self.request = request
+        return self.page.object_list
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.paginate_queryset_lazily(queryset, request, view)
+        return None if page is None else list(page)
+
+
+class StreamingLimitOffsetPagination(LimitOffsetPagination):
+    """Пагинация limit/offset, умеющая отдавать страницу без загрузки."""
+
+    def get_limit(self, request, streaming=False):
+        if self.limit_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.limit_query_param],
+                    strict=True,
+                    cutoff=get_max_size(streaming),
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.default_limit
+
+    def get_requested_size(self, request):
+        return self.get_limit(request, streaming=True)
+
+    def paginate_queryset_lazily(self, queryset, request, view=None,
+                                 streaming=False):
+        self.limit = self.get_limit(request, streaming)
+        if self.limit is None:
+            return None
+
+        self.count = self.get_count(queryset)
+        self.offset = self.get_offset(request)
+        self.request = request
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+
+        if self.count == 0 or self.offset > self.count:
+            return queryset.none()
+        return queryset[self.offset:self.offset + self.limit]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page = self.paginate_queryset_lazily(queryset, request, view)
+        return None if page is None else list(page)
+
+
+class CategoryGenrePagination(StreamingPageNumberPagination):
     page_size = 5
+
+
+class AuthorHistoryPagination(CursorPagination):
+    page_size = 10
+    ordering = '-pub_date'
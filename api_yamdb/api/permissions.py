@@ -1,12 +1,16 @@
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
 
+def is_admin(user):
+    return user.is_staff or user.is_admin
+
+
 class IsAdminOnly(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_staff or (request.user.is_admin)
+        return is_admin(request.user)
 
     def has_object_permission(self, request, view, obj):
-        return request.user.is_staff or (request.user.is_admin)
+        return is_admin(request.user)
 
 
 class AdminOrReadOnly(BasePermission):
@@ -14,7 +18,7 @@ class AdminOrReadOnly(BasePermission):
         return (
             request.method in SAFE_METHODS
             or request.user.is_authenticated
-            and (request.user.is_staff or request.user.is_admin)
+            and is_admin(request.user)
         )
 
 
@@ -35,3 +39,13 @@ class WriteOnlyAuthorOr(BasePermission):
                              or request.user.is_moderator))
                     )
                 )
+
+
+class IsModeratorOrAdmin(BasePermission):
+    def has_permission(self, request, view):
+        return (
+            request.user.is_authenticated
+            and (request.user.is_staff
+                 or request.user.is_admin
+                 or request.user.is_moderator)
+        )
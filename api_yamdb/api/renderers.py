@@ -0,0 +1,32 @@
+from django.conf import settings
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.renderers import JSONRenderer
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer с заранее созданным компактным кодировщиком.
+
+    Кодировщик создаётся один раз на процесс, а не на каждый ответ.
+    Параметры совпадают с JSONRenderer, поэтому вывод идентичен.
+    """
+
+    compact_encoder = JSONRenderer.encoder_class(
+        ensure_ascii=JSONRenderer.ensure_ascii,
+        allow_nan=not JSONRenderer.strict,
+        separators=(
+            SHORT_SEPARATORS if JSONRenderer.compact else LONG_SEPARATORS
+        ),
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if data is None or indent is not None or not settings.FAST_RENDERING:
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        return self.dumps(data).encode()
+
+    @classmethod
+    def dumps(cls, data):
+        ret = cls.compact_encoder.encode(data)
+        return ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
@@ -1,11 +1,13 @@
 from django.core.exceptions import ValidationError
 from django.forms import IntegerField
-from django.shortcuts import get_object_or_404
+from django.db.models import Q
 from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.relations import SlugRelatedField
 
-from reviews.models import Category, Genre, Title, Comment, Review, User
+from api.validators import validate_username
+from reviews.models import (ArchivedReview, Category, Comment, Genre, Review,
+                            Title, User)
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -13,7 +15,7 @@ class CategorySerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Category
-        exclude = ('id', )
+        exclude = ('id', 'titles_count')
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -21,7 +23,7 @@ class GenreSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Genre
-        exclude = ('id', )
+        exclude = ('id', 'titles_count')
 
 
 class TitleSerializer(serializers.ModelSerializer):
@@ -83,13 +85,15 @@ class ReviewSerializer(serializers.ModelSerializer):
     score = IntegerField(min_value=1, max_value=10)
 
     def validate(self, attrs):
-        context = self.context['view']
-        title = get_object_or_404(Title, id=context.kwargs.get('title_id'))
-        user = self.context.get('request').user
-        if Review.objects.filter(title=title, author=user).exists():
-            if self.context['request'].method in ['POST']:
-                raise serializers.ValidationError(
-                    'Только один отзыв от пользователя!')
+        request = self.context['request']
+        if request.method in ['POST'] and any(
+            model.objects.filter(
+                title=self.context['title'], author=request.user
+            ).exists()
+            for model in (Review, ArchivedReview)
+        ):
+            raise serializers.ValidationError(
+                'Только один отзыв от пользователя!')
         return super().validate(attrs)
 
     class Meta:
@@ -104,11 +108,32 @@ class CommentSerializer(serializers.ModelSerializer):
     author = SlugRelatedField(slug_field='username', read_only=True)
 
     class Meta:
-        fields = '__all__'
+        fields = ('id', 'author', 'text', 'pub_date', 'review')
         model = Comment
         read_only_fields = ['author']
 
 
+class UserReviewSerializer(ReviewSerializer):
+    """Сериализатор отзывов в истории пользователя."""
+
+    title_name = serializers.CharField(source='title.name', read_only=True)
+
+    class Meta(ReviewSerializer.Meta):
+        fields = ReviewSerializer.Meta.fields + ('title', 'title_name')
+
+
+class UserCommentSerializer(CommentSerializer):
+    """Сериализатор комментариев в истории пользователя."""
+
+    title = serializers.IntegerField(source='review.title_id', read_only=True)
+    title_name = serializers.CharField(
+        source='review.title.name', read_only=True
+    )
+
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ('title', 'title_name')
+
+
 class UserSerializer(serializers.ModelSerializer):
     """Сериализатор пользователей, модели User. """
 
@@ -122,6 +147,100 @@ class UserSerializer(serializers.ModelSerializer):
                   'role',
                   )
 
+    def validate_username(self, data):
+        return validate_username(data)
+
+
+class BulkUserSerializer(UserSerializer):
+    """Сериализатор пользователя в пакетном создании.
+
+    Уникальность проверяется для всего пакета одним запросом в
+    BulkUserCreateSerializer, а не запросом на каждое поле.
+    """
+
+    class Meta(UserSerializer.Meta):
+        extra_kwargs = {
+            'username': {'validators': []},
+            'email': {'validators': []},
+        }
+
+
+class BulkUserCreateSerializer(serializers.Serializer):
+    """Сериализатор пакетного создания пользователей."""
+
+    users = BulkUserSerializer(many=True, allow_empty=False)
+    send_invitations = serializers.BooleanField(default=False)
+
+    def validate_users(self, users):
+        if len(users) > 1000:
+            raise serializers.ValidationError(
+                'Не больше 1000 пользователей за запрос!')
+        usernames = [user['username'] for user in users]
+        emails = [user['email'] for user in users]
+        if (len(set(usernames)) != len(usernames)
+                or len(set(emails)) != len(emails)):
+            raise serializers.ValidationError(
+                'username и email в пакете должны быть уникальны!')
+        taken = User.objects.filter(
+            Q(username__in=usernames) | Q(email__in=emails)
+        ).values_list('username', 'email')
+        if taken:
+            raise serializers.ValidationError([
+                f'Пользователь {username} ({email}) уже существует!'
+                for username, email in taken
+            ])
+        return users
+
+
+class BulkUserUpdateItemSerializer(serializers.Serializer):
+    """Сериализатор изменений одного пользователя в пакете."""
+
+    username = serializers.CharField()
+    role = serializers.ChoiceField(choices=User.ROLE, required=False)
+    first_name = serializers.CharField(
+        max_length=30, allow_blank=True, required=False)
+    last_name = serializers.CharField(
+        max_length=150, allow_blank=True, required=False)
+    bio = serializers.CharField(allow_blank=True, required=False)
+
+
+class BulkUserUpdateSerializer(serializers.Serializer):
+    """Сериализатор пакетного изменения пользователей по username."""
+
+    users = BulkUserUpdateItemSerializer(many=True, allow_empty=False)
+
+    def validate_users(self, users):
+        if len(users) > 1000:
+            raise serializers.ValidationError(
+                'Не больше 1000 пользователей за запрос!')
+        usernames = [user['username'] for user in users]
+        if len(set(usernames)) != len(usernames):
+            raise serializers.ValidationError(
+                'username в пакете должны быть уникальны!')
+        instances = User.objects.in_bulk(usernames, field_name='username')
+        missing = set(usernames) - set(instances)
+        if missing:
+            raise serializers.ValidationError([
+                f'Пользователь {username} не найден!'
+                for username in sorted(missing)
+            ])
+        self.instances = instances
+        return users
+
+    def save(self):
+        fields = set()
+        users = []
+        for changes in self.validated_data['users']:
+            user = self.instances[changes['username']]
+            for field, value in changes.items():
+                setattr(user, field, value)
+                fields.add(field)
+            users.append(user)
+        fields.discard('username')
+        if fields:
+            User.objects.bulk_update(users, sorted(fields), batch_size=500)
+        return users
+
 
 class AuthSerializer(serializers.ModelSerializer):
     """Сериализатор для аутентификации пользователя. """
@@ -131,10 +250,7 @@ class AuthSerializer(serializers.ModelSerializer):
         fields = ('email', 'username')
 
     def validate_username(self, data):
-        if data == 'me':
-            raise ValidationError(
-                message='Нельзя создать пользователя с username = me!')
-        return data
+        return validate_username(data)
 
 
 class ObtainTokenSerializer(serializers.ModelSerializer):
@@ -145,3 +261,45 @@ class ObtainTokenSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('username', 'confirmation_code')
+
+
+class ModerationReviewSerializer(ReviewSerializer):
+    """Сериализатор отзывов в очереди модерации."""
+
+    class Meta(ReviewSerializer.Meta):
+        fields = ReviewSerializer.Meta.fields + ('title', 'is_hidden')
+
+
+class ModerationCommentSerializer(CommentSerializer):
+    """Сериализатор комментариев в очереди модерации."""
+
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ('is_hidden',)
+
+
+class ModerationFilterSerializer(serializers.Serializer):
+    """Сериализатор фильтров очереди модерации."""
+
+    target = serializers.ChoiceField(choices=('reviews', 'comments'))
+    archived = serializers.BooleanField(default=False)
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        max_length=1000,
+    )
+    author = serializers.CharField(required=False)
+    title = serializers.IntegerField(required=False)
+    date_from = serializers.DateTimeField(required=False)
+    date_to = serializers.DateTimeField(required=False)
+
+
+class ModerationSerializer(ModerationFilterSerializer):
+    """Сериализатор пакетного действия модератора."""
+
+    action = serializers.ChoiceField(choices=('hide', 'unhide', 'delete'))
+
+    def validate(self, attrs):
+        if not set(attrs) - {'target', 'archived', 'action'}:
+            raise serializers.ValidationError(
+                'Укажите ids или хотя бы один фильтр!')
+        return attrs
@@ -0,0 +1,111 @@
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+
+from api import facets, nginx_cache
+from reviews.models import (ArchivedReview, Category, Comment, Genre,
+                            GenreTitle, Review, Title, User)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def refresh_categories(sender, instance, **kwargs):
+    nginx_cache.refresh(['/api/v1/categories/', nginx_cache.TITLES_URL])
+
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def refresh_genres(sender, instance, **kwargs):
+    nginx_cache.refresh(['/api/v1/genres/', nginx_cache.TITLES_URL])
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def refresh_title(sender, instance, **kwargs):
+    nginx_cache.refresh_titles([instance.pk])
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def refresh_title_genres(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        nginx_cache.refresh_titles(pk_set or [])
+    else:
+        nginx_cache.refresh_titles([instance.pk])
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def refresh_reviews(sender, instance, **kwargs):
+    if instance.title_id is not None:
+        nginx_cache.refresh_titles([instance.title_id])
+
+
+@receiver(pre_delete, sender=User)
+def recount_author_ratings(sender, instance, **kwargs):
+    """Пересчитывает рейтинги произведений после удаления автора.
+
+    Отзывы удаляются каскадно без изменения агрегатов, поэтому
+    затронутые произведения пересчитываются после коммита.
+    """
+    title_ids = set()
+    for model in (Review, ArchivedReview):
+        title_ids.update(model.objects.visible().filter(
+            author=instance, title__isnull=False,
+        ).values_list('title_id', flat=True))
+    if title_ids:
+        transaction.on_commit(
+            lambda: Title.objects.filter(pk__in=title_ids).recount_ratings()
+        )
+
+
+# Удаление комментариев не отслеживается, чтобы не отключать быстрое
+# пакетное удаление; такие записи кеша устаревают по TTL.
+@receiver(post_save, sender=Comment)
+def refresh_comments(sender, instance, **kwargs):
+    review = instance.review
+    if review is None or review.title_id is None:
+        return
+    nginx_cache.refresh([
+        f'{nginx_cache.TITLES_URL}{review.title_id}/reviews/'
+        f'{review.pk}/comments/'
+    ])
+
+
+@receiver(pre_save, sender=Title)
+def remember_title_facets(sender, instance, **kwargs):
+    instance._old_facets = Title.objects.filter(pk=instance.pk).values_list(
+        'category_id', 'year'
+    ).first() if instance.pk else None
+
+
+@receiver(post_save, sender=Title)
+@receiver(post_delete, sender=Title)
+def count_title_facets(sender, instance, **kwargs):
+    category_ids = {instance.category_id}
+    years = {instance.year}
+    old = getattr(instance, '_old_facets', None)
+    if old is not None:
+        category_ids.add(old[0])
+        years.add(old[1])
+    facets.schedule_recount(category_ids=category_ids, years=years)
+
+
+@receiver(post_save, sender=GenreTitle)
+@receiver(post_delete, sender=GenreTitle)
+def count_genre_title_facets(sender, instance, **kwargs):
+    facets.schedule_recount(genre_ids={instance.genre_id})
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def count_title_genre_facets(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        facets.schedule_recount(genre_ids={instance.pk})
+    else:
+        facets.schedule_recount(genre_ids=pk_set)
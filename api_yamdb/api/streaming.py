@@ -0,0 +1,41 @@
+from itertools import islice
+
+from api.renderers import FastJSONRenderer
+
+
+def iter_chunks(rows, size):
+    rows = iter(rows)
+    chunk = list(islice(rows, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(rows, size))
+
+
+def stream_json(envelope, rows, values_serializer, chunk_size):
+    """Отдаёт JSON списка по частям, не собирая страницу целиком.
+
+    envelope - данные ответа пагинатора без results (None, если
+    пагинации нет). Строки сериализуются порциями по chunk_size,
+    поэтому в памяти одновременно находится не больше одной порции.
+    Результат совпадает с выводом FastJSONRenderer байт в байт.
+    """
+    dumps = FastJSONRenderer.dumps
+    separator = FastJSONRenderer.compact_encoder.item_separator
+    key_separator = FastJSONRenderer.compact_encoder.key_separator
+    if envelope is None:
+        head, tail = '[', ']'
+    else:
+        head = dumps(envelope)[:-1]
+        if envelope:
+            head += separator
+        head += dumps('results') + key_separator + '['
+        tail = ']}'
+
+    yield head.encode()
+    prefix = ''
+    for chunk in iter_chunks(rows, chunk_size):
+        yield (prefix + separator.join(
+            dumps(row) for row in values_serializer.serialize(chunk)
+        )).encode()
+        prefix = separator
+    yield tail.encode()
@@ -7,6 +7,7 @@ from .views import (
     TitleViewSet,
     CommentViewSet,
     ReviewsViewSet,
+    APIModeration,
     APISignUp,
     APIToken,
     UsersViewSet,
@@ -46,4 +47,5 @@ urlpatterns = [
     path('v1/auth/token/', APIToken.as_view(),
          name='token_obtain_pair'),
     path('v1/auth/signup/', APISignUp.as_view(), name='signup'),
+    path('v1/moderation/', APIModeration.as_view(), name='moderation'),
 ]
@@ -1,6 +1,9 @@
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+# Имена, занятые маршрутами users/me/ и users/bulk/.
+RESERVED_USERNAMES = ('me', 'bulk')
+
 
 def validate_year(value):
     if value > timezone.now().year:
@@ -8,3 +11,11 @@ def validate_year(value):
             'Нельзя добавлять произведения, которые еще не вышли',
         )
     return value
+
+
+def validate_username(value):
+    if value in RESERVED_USERNAMES:
+        raise ValidationError(
+            f'Нельзя создать пользователя с username = {value}!',
+        )
+    return value
@@ -1,27 +1,48 @@
-from django.db.models import Avg
+import threading
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum
 from django_filters.rest_framework import DjangoFilterBackend
-from django.core.mail import send_mail
 from django.conf import settings
+from django.core.mail import EmailMessage, get_connection, send_mail
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from rest_framework import filters, permissions, viewsets, status
+from rest_framework import filters, generics, permissions, viewsets, status
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
-from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.settings import api_settings
 from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
+from api import facets, nginx_cache
+from api.fast_serializers import (CommentValuesSerializer,
+                                  ReviewValuesSerializer,
+                                  TitleValuesSerializer)
 from api.filtres import TitleFilter
-from api.mixins import ListPatchDestroyViewSet
-from api.permissions import AdminOrReadOnly, IsAdminOnly, WriteOnlyAuthorOr
-from api.pagination import CategoryGenrePagination
-from api.serializers import (AuthSerializer, CategorySerializer,
+from api.mixins import FastListMixin, ListPatchDestroyViewSet, ParentMixin
+from api.permissions import (AdminOrReadOnly, IsAdminOnly,
+                             IsModeratorOrAdmin, WriteOnlyAuthorOr)
+from api.pagination import (AuthorHistoryPagination, CategoryGenrePagination,
+                            StreamingLimitOffsetPagination)
+from api.serializers import (AuthSerializer, BulkUserCreateSerializer,
+                             BulkUserUpdateSerializer, CategorySerializer,
                              CommentSerializer, GenreSerializer,
+                             ModerationCommentSerializer,
+                             ModerationFilterSerializer,
+                             ModerationReviewSerializer, ModerationSerializer,
                              ObtainTokenSerializer, PostTitleSerializer,
                              ReviewSerializer, TitleSerializer,
+                             UserCommentSerializer, UserReviewSerializer,
                              UserSerializer)
-from reviews.models import Category, Comment, Genre, Review, Title, User
+from api.write_buffer import comment_buffer
+from reviews.archive import ArchiveChain
+from reviews.models import (ArchivedComment, ArchivedReview, Category, Comment,
+                            ConfirmationCode, Genre, Review, Title, User)
 
 
 class CategoryViewSet(ListPatchDestroyViewSet):
@@ -52,66 +73,214 @@ class GenreViewSet(ListPatchDestroyViewSet):
     ]
 
 
-class TitleViewSet(viewsets.ModelViewSet):
+class TitleViewSet(FastListMixin, viewsets.ModelViewSet):
     """ModelViewSet для обработки эндпоинта /titles/."""
 
-    queryset = Title.objects.all().annotate(
-        rating=Avg('reviews__score'),
-    ).order_by('name')
+    queryset = Title.objects.with_rating().order_by('name')
     serializer_class = TitleSerializer
+    values_serializer = TitleValuesSerializer()
     pagination_class = CategoryGenrePagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = TitleFilter
     permission_classes = [
         AdminOrReadOnly,
     ]
+    lookup_value_regex = r'\d+'
+
+    def get_queryset(self):
+        if self.action == 'overview':
+            return self.queryset.select_related(
+                'category'
+            ).prefetch_related('genre')
+        return self.queryset
 
     def get_serializer_class(self):
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'overview']:
             return TitleSerializer
         return PostTitleSerializer
 
-
-class ReviewsViewSet(viewsets.ModelViewSet):
+    @action(detail=False, url_path='facets')
+    def facets(self, request):
+        """Число произведений по жанрам, категориям и годам для фильтра."""
+        params = {
+            name: request.query_params[name]
+            for name in TitleFilter.base_filters
+            if request.query_params.get(name)
+        }
+        if set(params) <= {'genre_mode'}:
+            params = {}
+        titles = self.filter_queryset(self.get_queryset())
+        return Response(facets.get_facets(titles, params))
+
+    @action(detail=True, url_path='similar')
+    def similar(self, request, pk=None):
+        """Похожие произведения из таблицы, рассчитанной заранее."""
+        queryset = self.values_serializer.prepare(
+            self.queryset.filter(similar_to__title_id=pk).order_by(
+                '-similar_to__score'
+            )
+        )
+        data = self.values_serializer.serialize(queryset)
+        if not data:
+            get_object_or_404(Title, pk=pk)
+        return Response(data)
+
+    @action(detail=True, url_path='overview')
+    def overview(self, request, pk=None):
+        """Произведение, распределение оценок и первая страница отзывов."""
+        title = self.get_object()
+        reviews = ArchiveChain(
+            ArchivedReview.objects.visible().filter(title=title),
+            Review.objects.visible().filter(title=title),
+        )
+        distribution = {str(score): 0 for score in range(1, 11)}
+        for queryset in (reviews.archived, reviews.live):
+            for score, count in queryset.order_by().values_list(
+                'score'
+            ).annotate(count=Count('id')):
+                distribution[str(score)] += count
+        reviews_count = sum(distribution.values())
+
+        limit = settings.REST_FRAMEWORK['PAGE_SIZE']
+        page = reviews.select_related('author')[:limit]
+        next_url = None
+        if reviews_count > limit:
+            next_url = replace_query_param(
+                reverse(
+                    'api:review-list',
+                    kwargs={'title_id': title.pk},
+                    request=request,
+                ),
+                'limit',
+                limit,
+            )
+            next_url = replace_query_param(next_url, 'offset', limit)
+        return Response({
+            'title': self.get_serializer(title).data,
+            'score_distribution': distribution,
+            'reviews_count': reviews_count,
+            'reviews': {
+                'count': reviews_count,
+                'next': next_url,
+                'previous': None,
+                'results': ReviewSerializer(
+                    page, many=True, context=self.get_serializer_context()
+                ).data,
+            },
+        })
+
+
+class ReviewsViewSet(ParentMixin, FastListMixin, viewsets.ModelViewSet):
     """ModelViewSet для обработки эндпоинта /reviews/."""
 
     serializer_class = ReviewSerializer
-    pagination_class = LimitOffsetPagination
+    values_serializer = ReviewValuesSerializer()
+    pagination_class = StreamingLimitOffsetPagination
     permission_classes = [
         WriteOnlyAuthorOr,
     ]
+    parent_queryset = Title.objects.all()
+    parent_lookup_kwargs = {'pk': 'title_id'}
+    parent_name = 'title'
 
     def get_queryset(self):
-        title_id = self.kwargs.get('title_id')
-        new_queryset = get_object_or_404(
-            Title, id=title_id).reviews.all()
-        return new_queryset
+        reviews = Review.objects.visible().filter(title=self.parent)
+        if self.action == 'list':
+            return ArchiveChain(
+                ArchivedReview.objects.visible().filter(title=self.parent),
+                reviews,
+            )
+        return reviews
+
+    def get_object(self):
+        try:
+            return super().get_object()
+        except Http404:
+            if self.request.method not in SAFE_METHODS:
+                raise
+        review = generics.get_object_or_404(
+            ArchivedReview.objects.visible(),
+            title=self.parent, pk=self.kwargs['pk'],
+        )
+        self.check_object_permissions(self.request, review)
+        return review
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get('title_id')
-        serializer.save(title_id=title_id, author=self.request.user)
+        try:
+            with transaction.atomic():
+                review = serializer.save(
+                    title=self.parent, author=self.request.user
+                )
+                Title.objects.change_ratings(
+                    {self.parent.pk: (1, review.score)}
+                )
+        except IntegrityError:
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Только один отзыв от пользователя!'
+                ]}
+            )
+
+    def lock_review(self, pk):
+        """Блокирует видимый отзыв до конца транзакции или отдаёт 404."""
+        review = Review.objects.visible().select_for_update().filter(
+            pk=pk
+        ).first()
+        if review is None:
+            raise Http404
+        return review
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.instance = self.lock_review(serializer.instance.pk)
+        old_score = serializer.instance.score
+        review = serializer.save()
+        Title.objects.change_ratings(
+            {review.title_id: (0, review.score - old_score)}
+        )
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        review = self.lock_review(instance.pk)
+        review.delete()
+        if review.title_id is not None:
+            Title.objects.change_ratings(
+                {review.title_id: (-1, -review.score)}
+            )
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(ParentMixin, FastListMixin, viewsets.ModelViewSet):
     """ModelViewSet для обработки эндпоинта /comment/."""
 
     serializer_class = CommentSerializer
-    pagination_class = LimitOffsetPagination
+    values_serializer = CommentValuesSerializer()
+    pagination_class = StreamingLimitOffsetPagination
     permission_classes = [
         WriteOnlyAuthorOr,
     ]
+    parent_queryset = Review.objects.visible().select_related('title')
+    parent_archive_queryset = ArchivedReview.objects.visible().select_related(
+        'title'
+    )
+    parent_lookup_kwargs = {'pk': 'review_id', 'title_id': 'title_id'}
+    parent_name = 'review'
 
     def get_queryset(self):
-        review_id = self.kwargs.get('review_id')
-        get_object_or_404(Review, id=review_id)
-        new_queryset = Comment.objects.filter(review_id=review_id)
-        return new_queryset
+        if isinstance(self.parent, ArchivedReview):
+            return ArchivedComment.objects.visible().filter(
+                review=self.parent
+            )
+        return Comment.objects.visible().filter(review=self.parent)
 
     def perform_create(self, serializer):
-        review_id = self.kwargs.get('review_id')
-        get_object_or_404(Review, id=review_id)
-        serializer.save(author=self.request.user,
-                        review_id=review_id)
+        if (not settings.COMMENT_WRITE_BUFFER
+                or transaction.get_connection().in_atomic_block):
+            serializer.save(author=self.request.user, review=self.parent)
+            return
+        serializer.instance = comment_buffer.submit(Comment(
+            author=self.request.user, review=self.parent,
+            **serializer.validated_data
+        ))
 
 
 class UsersViewSet(viewsets.ModelViewSet):
@@ -149,19 +318,124 @@ class UsersViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    def get_history(self, author, model):
+        paginator = AuthorHistoryPagination()
+        if model is Review:
+            queryset = Review.objects.visible().select_related('title')
+            serializer_class = UserReviewSerializer
+        else:
+            queryset = Comment.objects.visible().select_related(
+                'review__title'
+            )
+            serializer_class = UserCommentSerializer
+        page = paginator.paginate_queryset(
+            queryset.filter(author=author).select_related('author'),
+            self.request,
+            view=self,
+        )
+        serializer = serializer_class(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(methods=['post'], detail=False, url_path='bulk')
+    def bulk(self, request):
+        serializer = BulkUserCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                users = self.create_users(serializer.validated_data)
+        except IntegrityError:
+            raise ValidationError(
+                {'users': ['Пользователи с такими данными уже существуют!']}
+            )
+        return Response(
+            UserSerializer(users, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    @bulk.mapping.patch
+    def bulk_update(self, request):
+        serializer = BulkUserUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        users = serializer.save()
+        return Response(
+            UserSerializer(users, many=True).data,
+            status=status.HTTP_200_OK,
+        )
+
+    def create_users(self, data):
+        users = User.objects.bulk_create(
+            [User(**user) for user in data['users']], batch_size=500,
+        )
+        if users[0].pk is None:
+            users = list(User.objects.filter(
+                username__in=[user.username for user in users]
+            ))
+        if data['send_invitations']:
+            codes = ConfirmationCode.objects.issue_many(users)
+            transaction.on_commit(lambda: threading.Thread(
+                target=send_invitations, args=(codes,), daemon=True,
+            ).start())
+        return users
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_path='me/reviews',
+    )
+    def my_reviews(self, request):
+        return self.get_history(request.user, Review)
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        url_path='me/comments',
+    )
+    def my_comments(self, request):
+        return self.get_history(request.user, Comment)
+
+    @action(detail=True, url_path='reviews')
+    def user_reviews(self, request, username=None):
+        return self.get_history(self.get_object(), Review)
+
+    @action(detail=True, url_path='comments')
+    def user_comments(self, request, username=None):
+        return self.get_history(self.get_object(), Comment)
+
+
+def send_invitations(codes):
+    """Отправляет коды подтверждения пачкой через одно соединение."""
+    get_connection(fail_silently=True).send_messages([
+        EmailMessage(
+            'Ваш код подтверждения',
+            f'Код подтверждения - {code}',
+            settings.EMAIL_FROM,
+            (user.email, ),
+        )
+        for user, code in codes.items()
+    ])
+
 
 class APISignUp(APIView):
-    """APIView для регистрации нового пользователя."""
+    """APIView для регистрации нового пользователя.
+
+    Повторный запрос с теми же username и email выдаёт новый код
+    подтверждения уже зарегистрированному пользователю.
+    """
 
     permission_classes = (permissions.AllowAny,)
 
     def post(self, request):
-        serializer = AuthSerializer(data=request.data)
+        existing = User.objects.filter(
+            username=request.data.get('username'),
+            email=request.data.get('email'),
+        ).first()
+        serializer = AuthSerializer(existing, data=request.data)
         serializer.is_valid(raise_exception=True)
         email = serializer.validated_data.get('email')
-        user = serializer.save()
+        user = existing or serializer.save()
+        code = ConfirmationCode.objects.issue(user)
         mail_subject = 'Ваш код подтверждения'
-        message = f'Код подтверждения - {user.confirmation_code}'
+        message = f'Код подтверждения - {code}'
 
         send_mail(
             mail_subject,
@@ -174,7 +448,11 @@ class APISignUp(APIView):
 
 
 class APIToken(APIView):
-    """APIView для получения токена"""
+    """APIView для получения токена.
+
+    Код подтверждения одноразовый: он удаляется при выдаче токена, и из
+    параллельных запросов с одним кодом токен получает только один.
+    """
 
     permission_classes = (permissions.AllowAny,)
 
@@ -182,19 +460,128 @@ class APIToken(APIView):
         serializer = ObtainTokenSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         try:
-            user = User.objects.get(
+            user = User.objects.select_related('confirmation').get(
                 username=serializer.validated_data['username']
             )
         except User.DoesNotExist:
             return Response(status=status.HTTP_404_NOT_FOUND)
 
-        if (
+        try:
+            confirmation = user.confirmation
+        except ConfirmationCode.DoesNotExist:
+            return Response(status=status.HTTP_400_BAD_REQUEST)
+        if confirmation.check_code(
             serializer.validated_data['confirmation_code']
-            == user.confirmation_code
-        ):
+        ) and ConfirmationCode.objects.filter(
+            pk=confirmation.pk, code_hash=confirmation.code_hash,
+        ).delete()[0]:
             token = AccessToken.for_user(user)
             return Response(
                 {'token': str(token)},
                 status=status.HTTP_201_CREATED,
             )
         return Response(status=status.HTTP_400_BAD_REQUEST)
+
+
+class APIModeration(APIView):
+    """APIView для очереди модерации и пакетных действий модератора.
+
+    С archived=true очередь и действия относятся к архивным записям.
+    """
+
+    permission_classes = (IsModeratorOrAdmin,)
+    pagination_class = StreamingLimitOffsetPagination
+
+    def get_queryset(self, data):
+        if data['target'] == 'reviews':
+            model = ArchivedReview if data['archived'] else Review
+        else:
+            model = ArchivedComment if data['archived'] else Comment
+        queryset = model.objects.all()
+        if 'ids' in data:
+            queryset = queryset.filter(id__in=data['ids'])
+        if 'author' in data:
+            queryset = queryset.filter(author__username=data['author'])
+        if 'title' in data:
+            queryset = queryset.filter(
+                **{self.get_title_field(data): data['title']}
+            )
+        if 'date_from' in data:
+            queryset = queryset.filter(pub_date__gte=data['date_from'])
+        if 'date_to' in data:
+            queryset = queryset.filter(pub_date__lte=data['date_to'])
+        return queryset
+
+    def lock_targets(self, queryset):
+        """Блокирует выбранные записи по возрастанию id.
+
+        Дальнейшие изменения ограничены заблокированными строками, поэтому
+        агрегаты считаются по тем же данным, что меняет пакетное действие.
+        Записи блокируются раньше произведений, как и при правке отзыва.
+        """
+        ids = list(queryset.select_for_update(of=('self',)).order_by(
+            'pk'
+        ).values_list('pk', flat=True))
+        return queryset.model.objects.filter(pk__in=ids)
+
+    def get_rating_changes(self, data, queryset):
+        """Изменения агрегатов: по одному на затронутое произведение."""
+        if data['target'] != 'reviews':
+            return {}
+        sign = 1 if data['action'] == 'unhide' else -1
+        changed = queryset.filter(
+            is_hidden=data['action'] == 'unhide', title__isnull=False,
+        ).order_by().values('title_id').annotate(
+            count=Count('id'), total=Sum('score'),
+        ).values_list('title_id', 'count', 'total')
+        return {
+            title_id: (sign * count, sign * total)
+            for title_id, count, total in changed
+        }
+
+    def get_title_field(self, data):
+        if data['target'] == 'reviews':
+            return 'title_id'
+        return 'review__title_id'
+
+    def get(self, request):
+        serializer = ModerationFilterSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        queryset = self.get_queryset(data).select_related(
+            'author'
+        ).order_by('-pub_date')
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        if data['target'] == 'reviews':
+            page_serializer = ModerationReviewSerializer(page, many=True)
+        else:
+            page_serializer = ModerationCommentSerializer(page, many=True)
+        return paginator.get_paginated_response(page_serializer.data)
+
+    def post(self, request):
+        serializer = ModerationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        with transaction.atomic():
+            queryset = self.lock_targets(self.get_queryset(data))
+            title_ids = set(queryset.values_list(
+                self.get_title_field(data), flat=True
+            ).distinct())
+            title_ids.discard(None)
+            nginx_cache.refresh_titles(sorted(title_ids))
+            rating_changes = self.get_rating_changes(data, queryset)
+            if data['action'] == 'delete':
+                _, deleted = queryset.delete()
+                count = deleted.get(queryset.model._meta.label, 0)
+            else:
+                count = queryset.update(is_hidden=data['action'] == 'hide')
+            Title.objects.change_ratings(rating_changes)
+        return Response(
+            {
+                'target': data['target'],
+                'action': data['action'],
+                'count': count,
+            },
+            status=status.HTTP_200_OK,
+        )
@@ -0,0 +1,83 @@
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+
+from reviews.models import Comment
+
+
+class WriteBuffer:
+    """Группировка параллельных записей в одну транзакцию (group commit).
+
+    Первый поток, положивший запись в пустой буфер, становится ведущим:
+    ждёт window секунд или max_size записей и сохраняет всю пачку одним
+    вызовом flush. Остальные потоки ждут результат своей записи, поэтому
+    submit возвращается только после фиксации транзакции и гарантии
+    сохранности те же, что у обычной записи: подтверждённая запись уже
+    в базе, а при ошибке пачки каждая запись повторяется отдельно, и
+    исключение получает только её отправитель.
+    """
+
+    def __init__(self, flush, window, max_size):
+        self.flush = flush
+        self.window = window
+        self.max_size = max_size
+        self.condition = threading.Condition()
+        self.pending = []
+        self.has_leader = False
+
+    def submit(self, item):
+        future = Future()
+        with self.condition:
+            self.pending.append((item, future))
+            if len(self.pending) >= self.max_size:
+                self.condition.notify()
+            leader = not self.has_leader
+            self.has_leader = True
+        if leader:
+            with self.condition:
+                self.condition.wait_for(
+                    lambda: len(self.pending) >= self.max_size, self.window
+                )
+                batch, self.pending = self.pending, []
+                self.has_leader = False
+            self.flush_batch(batch)
+        return future.result()
+
+    def flush_batch(self, batch):
+        try:
+            results = self.flush([item for item, _ in batch])
+        except Exception as error:
+            if len(batch) == 1:
+                batch[0][1].set_exception(error)
+                return
+            for item, future in batch:
+                self.flush_batch([(item, future)])
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+def save_comments(comments):
+    """Сохраняет комментарии одной транзакцией с рассылкой post_save."""
+    with transaction.atomic():
+        if not connection.features.can_return_ids_from_bulk_insert:
+            for comment in comments:
+                comment.save()
+            return comments
+        Comment.objects.bulk_create(comments)
+        for comment in comments:
+            post_save.send(
+                sender=Comment, instance=comment, created=True, raw=False,
+                using=comment._state.db, update_fields=None,
+            )
+    return comments
+
+
+comment_buffer = WriteBuffer(
+    save_comments,
+    settings.COMMENT_WRITE_BUFFER_WINDOW,
+    settings.COMMENT_WRITE_BUFFER_SIZE,
+)
@@ -0,0 +1,133 @@
+import hashlib
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.crypto import constant_time_compare
+from rest_framework.permissions import SAFE_METHODS
+
+_state = threading.local()
+
+
+def replicas_allowed():
+    return getattr(_state, 'use_replicas', False)
+
+
+def pin_to_primary():
+    _state.use_replicas = False
+    _state.wrote = True
+
+
+def keep_replica_reads(iterable):
+    """Сохраняет выбор базы запроса для потокового ответа.
+
+    Потоковый ответ читает данные уже после ReplicaPinningMiddleware,
+    поэтому выбор, сделанный для запроса, восстанавливается на время
+    получения каждой порции.
+    """
+    use_replicas = replicas_allowed()
+
+    def generate():
+        iterator = iter(iterable)
+        while True:
+            previous = replicas_allowed()
+            _state.use_replicas = use_replicas
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                _state.use_replicas = previous
+            yield chunk
+
+    return generate()
+
+
+class ReplicaRouter:
+    """Роутер чтения каталога и отзывов с реплик.
+
+    Реплики используются только внутри безопасных запросов, которые
+    разрешил ReplicaPinningMiddleware; всё остальное идёт в default.
+    """
+
+    replicated_models = {
+        'reviews.category',
+        'reviews.genre',
+        'reviews.title',
+        'reviews.genretitle',
+        'reviews.review',
+        'reviews.comment',
+    }
+
+    def db_for_read(self, model, **hints):
+        if (
+            settings.DATABASE_REPLICAS
+            and replicas_allowed()
+            and model._meta.label_lower in self.replicated_models
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        pin_to_primary()
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """Решает, можно ли запросу читать с реплик.
+
+    Изменяющие запросы работают только с основной базой и закрепляют за
+    клиентом основную базу на REPLICA_STICKY_SECONDS, чтобы следующие
+    чтения видели только что записанные данные несмотря на отставание
+    реплик. Клиент определяется по заголовку Authorization, закрепление
+    хранится в общем кеше, чтобы его видели все воркеры.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sticky_key = self.get_sticky_key(request)
+        safe = request.method in SAFE_METHODS
+        _state.wrote = False
+        _state.use_replicas = (
+            safe
+            and not self.is_cache_refresh(request)
+            and not (sticky_key and cache.get(sticky_key))
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = not safe or _state.wrote
+            _state.use_replicas = False
+            _state.wrote = False
+        if sticky_key and wrote:
+            cache.set(sticky_key, True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    def is_cache_refresh(self, request):
+        """Обновление микрокеша nginx после записи читает основную базу.
+
+        Иначе отстающая реплика вернула бы страницу до записи, и nginx
+        сохранил бы её в кеш на новый TTL.
+        """
+        token = settings.NGINX_CACHE_REFRESH_TOKEN
+        return bool(token) and constant_time_compare(
+            request.META.get('HTTP_X_CACHE_REFRESH', ''), token
+        )
+
+    def get_sticky_key(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization or not settings.DATABASE_REPLICAS:
+            return None
+        digest = hashlib.sha256(authorization.encode()).hexdigest()
+        return f'replica-pin:{digest}'
@@ -0,0 +1,174 @@
+import cProfile
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from api.permissions import is_admin
+
+REQUEST_ID_RE = re.compile(r'^[\w-]{1,64}$')
+EXTENSIONS = ('.json', '.prof', '.collapsed')
+
+
+class StackSampler(threading.Thread):
+    """Периодически снимает стек потока для flamegraph.
+
+    Результат - счётчик стеков в свёрнутом виде (collapsed stacks):
+    кадры через точку с запятой от внешнего к внутреннему.
+    """
+
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.finished = threading.Event()
+
+    def run(self):
+        while not self.finished.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f'{os.path.basename(code.co_filename)}:{code.co_name}'
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.finished.set()
+        self.join()
+
+
+class ProfilingMiddleware:
+    """Профилирование отдельных запросов по требованию.
+
+    Запрос профилируется, если администратор прислал заголовок
+    X-Profile: 1, или случайно с вероятностью PROFILING_SAMPLE_RATE.
+    Профиль cProfile (pstats), свёрнутые стеки для flamegraph и описание
+    запроса сохраняются в PROFILING_DIR под id профиля, который
+    возвращается в заголовке X-Profile-Id. Самые старые профили
+    удаляются, когда каталог превышает PROFILING_MAX_BYTES.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.should_profile(request):
+            return self.get_response(request)
+        profile_id = self.get_profile_id(
+            request, request.META.get('HTTP_X_PROFILE') == '1'
+        )
+        sampler = StackSampler(
+            threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL
+        )
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        sampler.start()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+            sampler.stop()
+        duration = time.perf_counter() - started
+        save_profile(profile_id, profiler, sampler.stacks, {
+            'id': profile_id,
+            'created': time.time(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'duration': duration,
+        })
+        response['X-Profile-Id'] = profile_id
+        return response
+
+    def should_profile(self, request):
+        if request.META.get('HTTP_X_PROFILE') == '1':
+            return self.is_admin(request)
+        rate = settings.PROFILING_SAMPLE_RATE
+        return rate > 0 and random.random() < rate
+
+    def is_admin(self, request):
+        try:
+            authenticated = JWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return authenticated is not None and is_admin(authenticated[0])
+
+    def get_profile_id(self, request, requested):
+        """Id профиля и имя его файлов.
+
+        X-Request-ID берётся только в профилях, запрошенных
+        администратором: при случайной выборке имя файла выбирал бы
+        анонимный клиент и мог бы перезаписывать чужие профили.
+        """
+        request_id = request.META.get('HTTP_X_REQUEST_ID', '')
+        if requested and REQUEST_ID_RE.match(request_id):
+            return request_id
+        return uuid.uuid4().hex
+
+
+def save_profile(profile_id, profiler, stacks, meta):
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    path = os.path.join(settings.PROFILING_DIR, profile_id)
+    profiler.dump_stats(path + '.prof')
+    with open(path + '.collapsed', 'w') as collapsed:
+        for stack, count in stacks.most_common():
+            collapsed.write(f'{stack} {count}\n')
+    with open(path + '.json', 'w') as meta_file:
+        json.dump(meta, meta_file)
+    rotate_profiles(settings.PROFILING_MAX_BYTES)
+
+
+def list_profiles():
+    """Описания сохранённых профилей, от новых к старым."""
+    if not os.path.isdir(settings.PROFILING_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(settings.PROFILING_DIR):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(settings.PROFILING_DIR, name)) as meta:
+                profiles.append(json.load(meta))
+        except (OSError, ValueError):
+            continue
+    return sorted(profiles, key=lambda meta: -meta['created'])
+
+
+def profile_path(profile_id, extension):
+    return os.path.join(settings.PROFILING_DIR, profile_id + extension)
+
+
+def rotate_profiles(max_bytes):
+    profiles = list_profiles()
+    sizes = [
+        sum(
+            os.path.getsize(profile_path(meta['id'], extension))
+            for extension in EXTENSIONS
+            if os.path.exists(profile_path(meta['id'], extension))
+        )
+        for meta in profiles
+    ]
+    total = sum(sizes)
+    while profiles and total > max_bytes:
+        meta = profiles.pop()
+        total -= sizes.pop()
+        for extension in EXTENSIONS:
+            try:
+                os.remove(profile_path(meta['id'], extension))
+            except FileNotFoundError:
+                pass
@@ -20,6 +20,10 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+ARCHIVE_AFTER_DAYS = config('ARCHIVE_AFTER_DAYS', default=730, cast=int)
+
+CONFIRMATION_CODE_LIFETIME = datetime.timedelta(days=1)
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -36,11 +40,13 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'reviews.User'
 
 MIDDLEWARE = [
+    'api_yamdb.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api_yamdb.db_router.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -83,6 +89,38 @@ DATABASES = {
     }
 }
 
+DATABASE_REPLICAS = []
+
+for index, host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv())):
+    alias = f'replica_{index}'
+    DATABASES[alias] = dict(
+        DATABASES['default'], HOST=host, TEST={'MIRROR': 'default'},
+    )
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['api_yamdb.db_router.ReplicaRouter']
+
+REPLICA_STICKY_SECONDS = config('REPLICA_STICKY_SECONDS', default=5, cast=int)
+
+# Общий для всех воркеров кеш: закрепление клиента за основной БД и версия
+# фасетов должны быть видны каждому процессу. Без MEMCACHED_LOCATIONS
+# используется локальный кеш процесса (разработка и тесты).
+MEMCACHED_LOCATIONS = config('MEMCACHED_LOCATIONS', default='', cast=Csv())
+
+if MEMCACHED_LOCATIONS:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+            'LOCATION': MEMCACHED_LOCATIONS,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -117,9 +155,45 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
 }
+
+FAST_RENDERING = config('FAST_RENDERING', default=True, cast=bool)
+
+STREAMING_PAGE_SIZE = 1000
+
+STREAMING_CHUNK_SIZE = 500
+
+COMMENT_WRITE_BUFFER = config(
+    'COMMENT_WRITE_BUFFER', default=False, cast=bool
+)
+
+COMMENT_WRITE_BUFFER_WINDOW = 0.005
+
+COMMENT_WRITE_BUFFER_SIZE = 100
+
+PROFILING_DIR = os.path.join(BASE_DIR, 'profiles')
+
+PROFILING_SAMPLE_RATE = config(
+    'PROFILING_SAMPLE_RATE', default=0.0, cast=float
+)
+
+PROFILING_SAMPLE_INTERVAL = 0.001
+
+PROFILING_MAX_BYTES = 100 * 1024 * 1024
+
+FACETS_CACHE_SECONDS = 60
+
+NGINX_CACHE_URL = config('NGINX_CACHE_URL', default='')
+
+NGINX_CACHE_REFRESH_TOKEN = config('NGINX_CACHE_REFRESH_TOKEN', default='')
+
+NGINX_CACHE_REFRESH_TIMEOUT = 2
@@ -7,7 +7,10 @@ urlpatterns = [
     path('api/', include('api.urls')),
     path(
         'redoc/',
-        TemplateView.as_view(template_name='redoc.html'),
+        TemplateView.as_view(
+            template_name='redoc.html',
+            extra_context={'spec_url': '/static/docs/openapi.json'},
+        ),
         name='redoc'
     ),
 ]
@@ -0,0 +1,43 @@
+import multiprocessing
+
+# Имя config зарезервировано gunicorn под путь к файлу настроек.
+from decouple import config as env
+
+bind = env('GUNICORN_BIND', default='0:8000')
+
+workers = env(
+    'GUNICORN_WORKERS',
+    default=multiprocessing.cpu_count() * 2 + 1,
+    cast=int,
+)
+
+threads = env('GUNICORN_THREADS', default=2, cast=int)
+
+preload_app = env('GUNICORN_PRELOAD', default=True, cast=bool)
+
+max_requests = env('GUNICORN_MAX_REQUESTS', default=1000, cast=int)
+
+max_requests_jitter = env(
+    'GUNICORN_MAX_REQUESTS_JITTER', default=100, cast=int
+)
+
+keepalive = env('GUNICORN_KEEPALIVE', default=5, cast=int)
+
+timeout = env('GUNICORN_TIMEOUT', default=30, cast=int)
+
+graceful_timeout = env('GUNICORN_GRACEFUL_TIMEOUT', default=30, cast=int)
+
+
+def when_ready(server):
+    """При preload заранее импортируем URLconf и представления в мастере."""
+    if preload_app:
+        from django.urls import get_resolver
+
+        get_resolver().url_patterns
+
+
+def post_fork(server, worker):
+    """Не делим с мастером соединения с БД, открытые при preload."""
+    from django.db import connections
+
+    connections.close_all()
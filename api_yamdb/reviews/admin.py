@@ -1,36 +1,135 @@
 from django.contrib import admin
 
-from .models import User, Genre, Category
+from .models import (ArchivedComment, ArchivedReview, Category, Comment, Genre,
+                     GenreTitle, Review, Title, User)
+from .paginators import EstimatedCountPaginator
 
 
-class UserAdmin(admin.ModelAdmin):
+class LargeTableAdmin(admin.ModelAdmin):
+    """Базовая админка для больших таблиц: без точного COUNT(*)."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(User)
+class UserAdmin(LargeTableAdmin):
 
     list_display = (
         'username',
         'role',
         'bio',
         'email',
-        'confirmation_code',
     )
-    search_fields = ('username',)
+    search_fields = ('username__startswith', 'email__startswith')
     empty_value_display = '-пусто-'
     list_editable = ('role',)
 
 
-admin.site.register(User, UserAdmin)
-
-
 @admin.register(Genre)
-class ReviewAdmin(admin.ModelAdmin):
+class GenreAdmin(LargeTableAdmin):
     list_display = (
         'name',
         'slug',
+        'titles_count',
     )
+    readonly_fields = ('titles_count',)
+    search_fields = ('name__startswith', 'slug__startswith')
 
 
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(LargeTableAdmin):
     list_display = (
         'name',
         'slug',
+        'titles_count',
+    )
+    readonly_fields = ('titles_count',)
+    search_fields = ('name__startswith', 'slug__startswith')
+
+
+class GenreTitleInline(admin.TabularInline):
+    model = GenreTitle
+    autocomplete_fields = ('genre',)
+    extra = 1
+
+
+@admin.register(Title)
+class TitleAdmin(LargeTableAdmin):
+    list_display = (
+        'name',
+        'year',
+        'category',
+    )
+    list_select_related = ('category',)
+    search_fields = ('name__startswith',)
+    autocomplete_fields = ('category',)
+    inlines = (GenreTitleInline,)
+
+
+@admin.register(Review)
+class ReviewAdmin(LargeTableAdmin):
+    list_display = (
+        'pk',
+        'title',
+        'author',
+        'score',
+        'pub_date',
+        'is_hidden',
+    )
+    list_select_related = ('title', 'author')
+    search_fields = ('author__username__startswith',)
+    autocomplete_fields = ('title', 'author')
+    empty_value_display = '-пусто-'
+
+    def recount_ratings(self, title_ids):
+        Title.objects.filter(pk__in=title_ids).recount_ratings()
+
+    def save_model(self, request, obj, form, change):
+        old_title_id = form.initial.get('title')
+        super().save_model(request, obj, form, change)
+        self.recount_ratings([obj.title_id, old_title_id])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.recount_ratings([obj.title_id])
+
+    def delete_queryset(self, request, queryset):
+        title_ids = list(queryset.values_list('title_id', flat=True))
+        super().delete_queryset(request, queryset)
+        self.recount_ratings(title_ids)
+
+
+@admin.register(Comment)
+class CommentAdmin(LargeTableAdmin):
+    list_display = (
+        'pk',
+        'review',
+        'author',
+        'pub_date',
+        'is_hidden',
     )
+    list_select_related = ('review', 'author')
+    search_fields = ('author__username__startswith',)
+    autocomplete_fields = ('review', 'author')
+    empty_value_display = '-пусто-'
+
+
+@admin.register(ArchivedReview)
+class ArchivedReviewAdmin(ReviewAdmin):
+    """Архивные отзывы можно только скрыть или удалить."""
+
+    readonly_fields = ('id', 'title', 'author', 'text', 'pub_date', 'score')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ArchivedComment)
+class ArchivedCommentAdmin(CommentAdmin):
+    """Архивные комментарии можно только скрыть или удалить."""
+
+    readonly_fields = ('id', 'review', 'author', 'text', 'pub_date')
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,147 @@
+from itertools import chain
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils.functional import cached_property
+
+from reviews.models import ArchivedComment, ArchivedReview, Comment, Review
+
+
+class ArchiveChain:
+    """Архивные и оперативные записи как одна последовательность.
+
+    В архив попадают только записи старше оставшихся в оперативной
+    таблице, поэтому при сортировке по дате архив идёт первым. Из-за
+    этого первые страницы отзывов и обзор произведения читают архив:
+    каждый такой запрос считает архивные отзывы произведения (COUNT по
+    частичному индексу title, pub_date) и берёт из архива строки, если
+    они есть. Оперативная таблица читается, только если страница
+    дотягивается до неё. Архив уменьшает оперативную таблицу и её
+    индексы для записи, но не убирает старые отзывы из чтения списков.
+    Поддерживаются операции, которые нужны пагинаторам и
+    ValuesSerializer: count(), срезы, values_list() и iterator().
+    """
+
+    def __init__(self, archived, live, start=0, stop=None):
+        self.archived = archived
+        self.live = live
+        self.start = start
+        self.stop = stop
+
+    @cached_property
+    def archived_count(self):
+        return self.archived.count()
+
+    def clone(self, archived, live, start=None, stop=None):
+        result = ArchiveChain(
+            archived, live,
+            self.start if start is None else start,
+            self.stop if stop is None else stop,
+        )
+        if archived is self.archived and 'archived_count' in self.__dict__:
+            result.archived_count = self.archived_count
+        return result
+
+    def count(self):
+        total = self.archived_count + self.live.count()
+        if self.stop is not None:
+            total = min(total, self.stop)
+        return max(total - self.start, 0)
+
+    def none(self):
+        return self.clone(self.archived.none(), self.live.none(), 0, None)
+
+    def values_list(self, *fields, **kwargs):
+        return self.clone(
+            self.archived.values_list(*fields, **kwargs),
+            self.live.values_list(*fields, **kwargs),
+        )
+
+    def select_related(self, *fields):
+        return self.clone(
+            self.archived.select_related(*fields),
+            self.live.select_related(*fields),
+        )
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError('Поддерживаются только срезы без шага.')
+        start = self.start + (key.start or 0)
+        stop = self.stop
+        if key.stop is not None:
+            stop = self.start + key.stop
+            if self.stop is not None:
+                stop = min(stop, self.stop)
+        return self.clone(self.archived, self.live, start, stop)
+
+    def parts(self):
+        archived_count = self.archived_count
+        parts = []
+        if self.start < archived_count:
+            stop = archived_count
+            if self.stop is not None:
+                stop = min(stop, self.stop)
+            parts.append(self.archived[self.start:stop])
+        live_start = max(self.start - archived_count, 0)
+        if self.stop is None:
+            parts.append(self.live[live_start:])
+        elif self.stop > archived_count:
+            parts.append(self.live[live_start:self.stop - archived_count])
+        return parts
+
+    def iterator(self, chunk_size=2000):
+        return chain.from_iterable(
+            part.iterator(chunk_size=chunk_size) for part in self.parts()
+        )
+
+    def __iter__(self):
+        return chain.from_iterable(self.parts())
+
+
+def archive_batch(cutoff, batch_size):
+    """Переносит в архив пачку отзывов старше cutoff с комментариями.
+
+    Отзывы с комментариями новее cutoff остаются на месте, а вместе с
+    ними и более поздние отзывы того же произведения: так архив всегда
+    старше оперативной таблицы, как ожидает ArchiveChain. Каждая пачка
+    переносится в своей транзакции с блокировкой строк, поэтому перенос
+    можно прервать и продолжить в любой момент. Агрегаты рейтинга не
+    меняются: архивные отзывы в них по-прежнему учтены. Возвращает число
+    перенесённых отзывов.
+    """
+    held_back = Review.objects.filter(
+        title=OuterRef('title'),
+        pub_date__lte=OuterRef('pub_date'),
+        review_comments__pub_date__gte=cutoff,
+    )
+    with transaction.atomic():
+        reviews = list(Review.objects.select_for_update().annotate(
+            held_back=Exists(held_back),
+        ).filter(
+            pub_date__lt=cutoff, held_back=False,
+        ).order_by('pk')[:batch_size])
+        if not reviews:
+            return 0
+        comments = list(Comment.objects.select_for_update().filter(
+            review__in=reviews,
+        ))
+        ArchivedReview.objects.bulk_create(
+            ArchivedReview(
+                id=review.pk, title_id=review.title_id,
+                author_id=review.author_id, text=review.text,
+                pub_date=review.pub_date, score=review.score,
+                is_hidden=review.is_hidden,
+            )
+            for review in reviews
+        )
+        ArchivedComment.objects.bulk_create(
+            ArchivedComment(
+                id=comment.pk, review_id=comment.review_id,
+                author_id=comment.author_id, text=comment.text,
+                pub_date=comment.pub_date, is_hidden=comment.is_hidden,
+            )
+            for comment in comments
+        )
+        Comment.objects.filter(pk__in=[c.pk for c in comments]).delete()
+        Review.objects.filter(pk__in=[r.pk for r in reviews]).delete()
+    return len(reviews)
@@ -0,0 +1,46 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from reviews.archive import archive_batch
+
+
+class Command(BaseCommand):
+    """Перенос старых отзывов и комментариев в архивные таблицы.
+
+    Работает пачками, каждая в своей транзакции, поэтому команду можно
+    прервать и запустить снова: она продолжит с оставшихся записей.
+    """
+
+    help = 'Переносит старые отзывы с комментариями в архив.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.ARCHIVE_AFTER_DAYS,
+            help='Возраст отзыва в днях, после которого он архивируется.',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--max-batches', type=int, default=0,
+            help='Остановиться после указанного числа пачек (0 - все).',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Пауза между пачками в секундах.',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        total = batches = 0
+        while not options['max_batches'] or batches < options['max_batches']:
+            moved = archive_batch(cutoff, options['batch_size'])
+            if not moved:
+                break
+            total += moved
+            batches += 1
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(f'Перенесено в архив отзывов: {total}')
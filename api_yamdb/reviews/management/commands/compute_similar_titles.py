@@ -0,0 +1,185 @@
+import heapq
+import math
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from reviews.models import (ArchivedReview, GenreTitle, Review, SimilarTitle,
+                            Title)
+
+
+class Command(BaseCommand):
+    """Расчёт таблицы похожих произведений.
+
+    Сходство складывается из пересечения жанров (коэффициент Жаккара) и
+    совместных отзывов: пользователи, оценившие оба произведения близкими
+    оценками, сближают их. Матрицы хранятся разреженно в словарях, а
+    кандидаты по жанрам ограничены лучшими наборами жанров, поэтому
+    работа на одно произведение не зависит от размера каталога.
+    """
+
+    help = 'Пересчитывает top-K похожих произведений.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=10)
+        parser.add_argument(
+            '--genre-weight', type=float, default=0.5,
+            help='Вес сходства по жанрам, остальное - совместные отзывы.',
+        )
+        parser.add_argument(
+            '--genre-candidates', type=int, default=100,
+            help='Сколько кандидатов брать по наборам жанров.',
+        )
+        parser.add_argument(
+            '--max-user-reviews', type=int, default=500,
+            help='Пользователи с большим числом отзывов не учитываются.',
+        )
+        parser.add_argument(
+            '--since',
+            help='Пересчитать только произведения с отзывами после '
+                 'указанного момента (ISO 8601), их соседей по совместным '
+                 'отзывам и ещё не рассчитанные. Смену жанров, скрытие и '
+                 'удаление отзывов режим не замечает: после них нужен '
+                 'полный пересчёт.',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.load()
+        title_ids = self.get_title_ids(options['since'])
+        for start in range(0, len(title_ids), options['batch_size']):
+            batch = title_ids[start:start + options['batch_size']]
+            rows = [
+                SimilarTitle(title_id=title_id, similar_id=similar_id,
+                             score=score)
+                for title_id in batch
+                for similar_id, score in self.get_similar(title_id)
+            ]
+            with transaction.atomic():
+                SimilarTitle.objects.filter(title_id__in=batch).delete()
+                SimilarTitle.objects.bulk_create(rows)
+        self.stdout.write(f'Пересчитано произведений: {len(title_ids)}')
+
+    def load(self):
+        self.title_genres = defaultdict(frozenset)
+        genres = defaultdict(set)
+        for title_id, genre_id in GenreTitle.objects.values_list(
+            'title_id', 'genre_id'
+        ).iterator():
+            genres[title_id].add(genre_id)
+        for title_id, genre_ids in genres.items():
+            self.title_genres[title_id] = frozenset(genre_ids)
+
+        self.title_reviews = defaultdict(list)
+        user_reviews = defaultdict(list)
+        for model in (ArchivedReview, Review):
+            for title_id, author_id, score in model.objects.visible().filter(
+                title__isnull=False,
+            ).values_list('title_id', 'author_id', 'score').iterator():
+                self.title_reviews[title_id].append((author_id, score))
+                user_reviews[author_id].append((title_id, score))
+        self.user_reviews = {
+            author_id: reviews
+            for author_id, reviews in user_reviews.items()
+            if len(reviews) <= self.options['max_user_reviews']
+        }
+
+        titles_by_signature = defaultdict(list)
+        for title_id in Title.objects.values_list('id', flat=True).iterator():
+            titles_by_signature[self.title_genres[title_id]].append(title_id)
+        for title_ids in titles_by_signature.values():
+            title_ids.sort(key=lambda pk: -len(self.title_reviews[pk]))
+        self.titles_by_signature = titles_by_signature
+        self.signature_ranking = {}
+
+    def get_title_ids(self, since):
+        """Произведения для пересчёта.
+
+        В режиме --since пересчёт приблизительный: у GenreTitle нет
+        отметки времени, а скрытые и удалённые отзывы не оставляют
+        следа, поэтому такие изменения подхватывает только полный
+        пересчёт. Новый отзыв меняет сходство со всеми произведениями,
+        которые оценивали авторы отзывов изменённого произведения, так
+        что они пересчитываются вместе с ним.
+        """
+        if not since:
+            return list(Title.objects.order_by('id').values_list(
+                'id', flat=True
+            ))
+        changed = set(Review.objects.filter(
+            pub_date__gte=parse_datetime(since), title__isnull=False,
+        ).values_list('title_id', flat=True).distinct())
+        neighbours = {
+            other_id
+            for title_id in changed
+            for author_id, _ in self.title_reviews[title_id]
+            for other_id, _ in self.user_reviews.get(author_id, ())
+        }
+        changed.update(neighbours)
+        changed.update(Title.objects.filter(
+            similar_titles__isnull=True,
+        ).values_list('id', flat=True))
+        return sorted(changed)
+
+    def get_genre_candidates(self, signature):
+        ranking = self.signature_ranking.get(signature)
+        if ranking is None:
+            ranking = sorted(
+                (
+                    (jaccard(signature, other), other)
+                    for other in self.titles_by_signature
+                    if signature & other
+                ),
+                key=lambda item: -item[0],
+            )
+            self.signature_ranking[signature] = ranking
+        candidates = []
+        for _, other in ranking:
+            candidates += self.titles_by_signature[other][
+                :self.options['genre_candidates'] + 1
+            ]
+            if len(candidates) > self.options['genre_candidates']:
+                break
+        return candidates
+
+    def get_similar(self, title_id):
+        co_reviews = defaultdict(float)
+        for author_id, score in self.title_reviews[title_id]:
+            for other_id, other_score in self.user_reviews.get(author_id, ()):
+                co_reviews[other_id] += 1 - abs(score - other_score) / 9
+        signature = self.title_genres[title_id]
+        candidates = set(co_reviews)
+        candidates.update(self.get_genre_candidates(signature))
+        candidates.discard(title_id)
+
+        genre_weight = self.options['genre_weight']
+        reviews_count = len(self.title_reviews[title_id])
+        scores = []
+        for other_id in candidates:
+            co_review = 0
+            if other_id in co_reviews:
+                co_review = co_reviews[other_id] / math.sqrt(
+                    reviews_count * len(self.title_reviews[other_id])
+                )
+            score = (
+                genre_weight * jaccard(signature, self.title_genres[other_id])
+                + (1 - genre_weight) * co_review
+            )
+            if score > 0:
+                scores.append((score, -other_id))
+        return [
+            (-negative_id, score)
+            for score, negative_id in heapq.nlargest(
+                self.options['top_k'], scores
+            )
+        ]
+
+
+def jaccard(first, second):
+    if not first or not second:
+        return 0
+    common = len(first & second)
+    return common / (len(first) + len(second) - common)
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from reviews.models import ConfirmationCode
+
+
+class Command(BaseCommand):
+    """Удаление просроченных кодов подтверждения пачками.
+
+    Запускается периодически, например из cron.
+    """
+
+    help = 'Удаляет просроченные коды подтверждения.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        expired = ConfirmationCode.objects.filter(
+            expires_at__lte=timezone.now()
+        )
+        total = 0
+        while True:
+            batch = list(
+                expired.values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            total += ConfirmationCode.objects.filter(pk__in=batch).delete()[0]
+        self.stdout.write(f'Удалено просроченных кодов: {total}')
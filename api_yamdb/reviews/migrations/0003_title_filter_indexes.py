@@ -0,0 +1,21 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0002_moderation_hidden'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='genretitle',
+            index=models.Index(fields=['genre', 'title'], name='genretitle_genre_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='title',
+            index=models.Index(fields=['year'], name='title_year_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_title_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['author', 'pub_date'], name='comment_author_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['author', 'pub_date'], name='review_author_date_idx'),
+        ),
+    ]
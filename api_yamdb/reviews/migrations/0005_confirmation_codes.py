@@ -0,0 +1,59 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+import reviews.models
+
+
+def move_confirmation_codes(apps, schema_editor):
+    User = apps.get_model('reviews', 'User')
+    ConfirmationCode = apps.get_model('reviews', 'ConfirmationCode')
+    expires_at = timezone.now() + settings.CONFIRMATION_CODE_LIFETIME
+    users = User.objects.filter(
+        confirmation_code__isnull=False,
+    ).values_list('id', 'confirmation_code')
+    ConfirmationCode.objects.bulk_create(
+        (
+            ConfirmationCode(
+                user_id=user_id,
+                code_hash=reviews.models.hash_confirmation_code(
+                    user_id, code
+                ),
+                expires_at=expires_at,
+            )
+            for user_id, code in users.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_author_history_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConfirmationCode',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='confirmation', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+                ('code_hash', models.CharField(max_length=40, verbose_name='хеш кода')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='действует до')),
+            ],
+            options={
+                'verbose_name': 'код подтверждения',
+                'verbose_name_plural': 'коды подтверждения',
+            },
+        ),
+        migrations.RunPython(
+            move_confirmation_codes, migrations.RunPython.noop,
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='confirmation_code',
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_confirmation_codes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='name',
+            field=models.CharField(db_index=True, max_length=256, verbose_name='название категории'),
+        ),
+        migrations.AlterField(
+            model_name='genre',
+            name='name',
+            field=models.CharField(db_index=True, max_length=256, verbose_name='название жанра'),
+        ),
+        migrations.AlterField(
+            model_name='title',
+            name='name',
+            field=models.CharField(db_index=True, max_length=250, verbose_name='название'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_name_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SimilarTitle',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='сходство')),
+                ('similar', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_to', to='reviews.Title', verbose_name='похожее произведение')),
+                ('title', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='similar_titles', to='reviews.Title', verbose_name='произведение')),
+            ],
+            options={
+                'verbose_name': 'похожее произведение',
+                'verbose_name_plural': 'похожие произведения',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='similartitle',
+            index=models.Index(fields=['title', '-score'], name='similar_title_score_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='similartitle',
+            constraint=models.UniqueConstraint(fields=('title', 'similar'), name='unique_similar_title'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:46
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def count_ratings(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    Title = apps.get_model('reviews', 'Title')
+    reviews = Review.objects.filter(
+        title=OuterRef('pk'), is_hidden=False,
+    ).order_by().values('title')
+    Title.objects.update(
+        reviews_count=Coalesce(
+            Subquery(reviews.annotate(count=Count('id')).values('count')), 0
+        ),
+        score_total=Coalesce(
+            Subquery(reviews.annotate(total=Sum('score')).values('total')), 0
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0007_similar_titles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='reviews_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='число отзывов'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='score_total',
+            field=models.PositiveIntegerField(default=0, verbose_name='сумма оценок'),
+        ),
+        migrations.RunPython(count_ratings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0008_title_rating_aggregates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedReview',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('text', models.TextField()),
+                ('pub_date', models.DateTimeField(verbose_name='дата публикации')),
+                ('score', models.IntegerField(verbose_name='оценка')),
+                ('is_hidden', models.BooleanField(default=False, verbose_name='скрыт модератором')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_reviews', to=settings.AUTH_USER_MODEL, verbose_name='автор')),
+                ('title', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_reviews', to='reviews.Title', verbose_name='произведение')),
+            ],
+            options={
+                'verbose_name': 'архивный отзыв',
+                'verbose_name_plural': 'архивные отзывы',
+                'ordering': ['pub_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedComment',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False)),
+                ('text', models.TextField(verbose_name='текст')),
+                ('pub_date', models.DateTimeField(verbose_name='дата публикации')),
+                ('is_hidden', models.BooleanField(default=False, verbose_name='скрыт модератором')),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_comments', to=settings.AUTH_USER_MODEL, verbose_name='автор')),
+                ('review', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='comments', to='reviews.ArchivedReview', verbose_name='отзыв')),
+            ],
+            options={
+                'verbose_name': 'архивный комментарий',
+                'verbose_name_plural': 'архивные комментарии',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedreview',
+            index=models.Index(condition=models.Q(is_hidden=False), fields=['title', 'pub_date'], name='archived_review_visible_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='archivedreview',
+            constraint=models.UniqueConstraint(fields=('author', 'title'), name='unique_archived_review'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedcomment',
+            index=models.Index(condition=models.Q(is_hidden=False), fields=['review', 'pub_date'], name='archived_comment_visible_idx'),
+        ),
+    ]
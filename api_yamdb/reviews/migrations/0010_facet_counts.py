@@ -0,0 +1,62 @@
+# Generated by Django 2.2.16 on 2026-10-19 09:58
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_facets(apps, schema_editor):
+    Category = apps.get_model('reviews', 'Category')
+    Genre = apps.get_model('reviews', 'Genre')
+    GenreTitle = apps.get_model('reviews', 'GenreTitle')
+    Title = apps.get_model('reviews', 'Title')
+    TitleYearCount = apps.get_model('reviews', 'TitleYearCount')
+    for model, related, field in (
+        (Category, Title, 'category'),
+        (Genre, GenreTitle, 'genre'),
+    ):
+        counts = related.objects.filter(
+            **{field: OuterRef('pk')}
+        ).order_by().values(field).annotate(
+            count=Count('pk')
+        ).values('count')
+        model.objects.update(titles_count=Coalesce(Subquery(counts), 0))
+    TitleYearCount.objects.bulk_create(
+        TitleYearCount(year=year, titles_count=count)
+        for year, count in Title.objects.filter(
+            year__isnull=False,
+        ).order_by().values_list('year').annotate(Count('pk'))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0009_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TitleYearCount',
+            fields=[
+                ('year', models.PositiveSmallIntegerField(primary_key=True, serialize=False, verbose_name='год')),
+                ('titles_count', models.PositiveIntegerField(verbose_name='число произведений')),
+            ],
+            options={
+                'verbose_name': 'число произведений за год',
+                'verbose_name_plural': 'число произведений по годам',
+                'ordering': ['year'],
+            },
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='titles_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='число произведений'),
+        ),
+        migrations.AddField(
+            model_name='genre',
+            name='titles_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='число произведений'),
+        ),
+        migrations.RunPython(count_facets, migrations.RunPython.noop),
+    ]
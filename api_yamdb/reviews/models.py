@@ -1,9 +1,12 @@
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.contrib.auth.tokens import default_token_generator
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.utils import timezone
+from django.utils.crypto import (constant_time_compare, get_random_string,
+                                 salted_hmac)
 
 from api.validators import validate_year
 
@@ -47,14 +50,6 @@ class User(AbstractUser):
         null=False
     )
 
-    confirmation_code = models.CharField(
-        max_length=70,
-        unique=True,
-        blank=True,
-        null=True,
-        verbose_name='confirmation_code'
-    )
-
     class Meta:
         ordering = ['username']
         verbose_name = 'пользователь'
@@ -73,19 +68,129 @@ class User(AbstractUser):
         return self.role == MODERATOR
 
 
-@receiver(post_save, sender=User)
-def create_profile(sender, instance, created, **kwargs):
-    if created:
-        instance.confirmation_code = default_token_generator.make_token(
-            user=instance
+def hash_confirmation_code(user_id, code):
+    return salted_hmac(
+        'reviews.ConfirmationCode', f'{user_id}:{code}'
+    ).hexdigest()
+
+
+class ConfirmationCodeManager(models.Manager):
+    def issue(self, user):
+        """Создаёт новый код пользователю и возвращает его в открытом виде."""
+        code = get_random_string(length=20)
+        self.update_or_create(
+            user=user,
+            defaults={
+                'code_hash': hash_confirmation_code(user.pk, code),
+                'expires_at': (
+                    timezone.now() + settings.CONFIRMATION_CODE_LIFETIME
+                ),
+            },
+        )
+        return code
+
+    def issue_many(self, users):
+        """Создаёт коды новым пользователям одним INSERT.
+
+        Возвращает словарь {пользователь: код в открытом виде}.
+        """
+        expires_at = timezone.now() + settings.CONFIRMATION_CODE_LIFETIME
+        codes = {user: get_random_string(length=20) for user in users}
+        self.bulk_create(
+            [
+                self.model(
+                    user=user,
+                    code_hash=hash_confirmation_code(user.pk, code),
+                    expires_at=expires_at,
+                )
+                for user, code in codes.items()
+            ],
+            batch_size=500,
+        )
+        return codes
+
+
+class ConfirmationCode(models.Model):
+    """Модель хешированных кодов подтверждения с ограниченным сроком."""
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='confirmation',
+        verbose_name='пользователь',
+    )
+    code_hash = models.CharField('хеш кода', max_length=40)
+    expires_at = models.DateTimeField('действует до', db_index=True)
+
+    objects = ConfirmationCodeManager()
+
+    class Meta:
+        verbose_name = 'код подтверждения'
+        verbose_name_plural = 'коды подтверждения'
+
+    def check_code(self, code):
+        return (
+            self.expires_at > timezone.now()
+            and constant_time_compare(
+                self.code_hash, hash_confirmation_code(self.user_id, code)
+            )
+        )
+
+
+class TitleQuerySet(models.QuerySet):
+    """Queryset произведений с рейтингом из хранимых агрегатов."""
+
+    def with_rating(self):
+        return self.annotate(rating=models.ExpressionWrapper(
+            Cast('score_total', models.FloatField())
+            / NullIf('reviews_count', 0),
+            output_field=models.FloatField(),
+        ))
+
+    def change_ratings(self, changes):
+        """Атомарно сдвигает агрегаты через F() без чтения строк.
+
+        changes - словарь {title_id: (изменение числа, изменение суммы)}.
+        Строки блокируются по возрастанию id, чтобы пакетные изменения
+        не взаимоблокировались.
+        """
+        for title_id in sorted(changes):
+            count, total = changes[title_id]
+            if count or total:
+                self.filter(pk=title_id).update(
+                    reviews_count=F('reviews_count') + count,
+                    score_total=F('score_total') + total,
+                )
+
+    def recount_ratings(self):
+        """Пересчитывает агрегаты по видимым отзывам одним UPDATE.
+
+        Учитываются и оперативные, и архивные отзывы.
+        """
+        counts, totals = [], []
+        for model in (Review, ArchivedReview):
+            reviews = model.objects.visible().filter(
+                title=OuterRef('pk'),
+            ).order_by().values('title')
+            counts.append(Coalesce(
+                Subquery(reviews.annotate(count=Count('id')).values('count')),
+                0,
+            ))
+            totals.append(Coalesce(
+                Subquery(reviews.annotate(total=Sum('score')).values('total')),
+                0,
+            ))
+        return self.update(
+            reviews_count=counts[0] + counts[1],
+            score_total=totals[0] + totals[1],
         )
-        instance.save()
 
 
 class Title(models.Model):
     """Модель произведений."""
 
-    name = models.CharField('название', max_length=250)
+    name = models.CharField('название', max_length=250, db_index=True)
     year = models.PositiveSmallIntegerField(
         'год',
         null=True,
@@ -104,35 +209,61 @@ class Title(models.Model):
         through='GenreTitle',
         verbose_name='жанр',
     )
+    reviews_count = models.PositiveIntegerField('число отзывов', default=0)
+    score_total = models.PositiveIntegerField('сумма оценок', default=0)
+
+    objects = TitleQuerySet.as_manager()
 
     class Meta:
+        indexes = [
+            models.Index(fields=['year'], name='title_year_idx'),
+        ]
         verbose_name = 'произведение'
         verbose_name_plural = 'произведения'
 
+    def __str__(self):
+        return self.name
+
 
 class Category(models.Model):
     """Модель категорий."""
 
-    name = models.CharField('название категории', max_length=256,)
+    name = models.CharField(
+        'название категории', max_length=256, db_index=True,
+    )
     slug = models.SlugField('ссылка', unique=True)
+    titles_count = models.PositiveIntegerField(
+        'число произведений', default=0,
+    )
 
     class Meta:
         ordering = ['name']
         verbose_name = 'категория'
         verbose_name_plural = 'категории'
 
+    def __str__(self):
+        return self.name
+
 
 class Genre(models.Model):
     """Модель жанров."""
 
-    name = models.CharField('название жанра', max_length=256,)
+    name = models.CharField(
+        'название жанра', max_length=256, db_index=True,
+    )
     slug = models.SlugField('ссылка', unique=True)
+    titles_count = models.PositiveIntegerField(
+        'число произведений', default=0,
+    )
 
     class Meta:
         ordering = ['name']
         verbose_name = 'жанр'
         verbose_name_plural = 'жанры'
 
+    def __str__(self):
+        return self.name
+
 
 class GenreTitle(models.Model):
     """Модель жанров произведений."""
@@ -157,10 +288,72 @@ class GenreTitle(models.Model):
                 name='unique_GenreTitle'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['genre', 'title'],
+                name='genretitle_genre_title_idx',
+            ),
+        ]
         verbose_name = 'жанр произведения'
         verbose_name_plural = 'жанры произведений'
 
 
+class TitleYearCount(models.Model):
+    """Число произведений по годам для фасетов каталога."""
+
+    year = models.PositiveSmallIntegerField('год', primary_key=True)
+    titles_count = models.PositiveIntegerField('число произведений')
+
+    class Meta:
+        ordering = ['year']
+        verbose_name = 'число произведений за год'
+        verbose_name_plural = 'число произведений по годам'
+
+
+class VisibleQuerySet(models.QuerySet):
+    """Queryset с исключением скрытых модераторами записей."""
+
+    def visible(self):
+        return self.filter(is_hidden=False)
+
+
+class SimilarTitle(models.Model):
+    """Модель похожих произведений: top-K соседей каждого произведения.
+
+    Заполняется командой compute_similar_titles.
+    """
+
+    title = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='similar_titles',
+        verbose_name='произведение',
+    )
+    similar = models.ForeignKey(
+        Title,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='похожее произведение',
+    )
+    score = models.FloatField('сходство')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['title', 'similar'],
+                name='unique_similar_title',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['title', '-score'],
+                name='similar_title_score_idx',
+            ),
+        ]
+        verbose_name = 'похожее произведение'
+        verbose_name_plural = 'похожие произведения'
+
+
 class Review(models.Model):
     """Модель отзывов."""
 
@@ -187,6 +380,9 @@ class Review(models.Model):
             MaxValueValidator(10, message='оценка не может быть больше 10'),
             MinValueValidator(1, message='оценка не может быть меньше 1')
         ])
+    is_hidden = models.BooleanField('скрыт модератором', default=False)
+
+    objects = VisibleQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -195,10 +391,24 @@ class Review(models.Model):
                 name='unique_review',
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['title', 'pub_date'],
+                condition=models.Q(is_hidden=False),
+                name='review_visible_idx',
+            ),
+            models.Index(
+                fields=['author', 'pub_date'],
+                name='review_author_date_idx',
+            ),
+        ]
         ordering = ['pub_date']
         verbose_name = 'отзыв'
         verbose_name_plural = 'отзывы'
 
+    def __str__(self):
+        return self.text[:30]
+
 
 class Comment(models.Model):
     """Модель комментариев."""
@@ -225,7 +435,116 @@ class Comment(models.Model):
         auto_now_add=True,
         db_index=True,
     )
+    is_hidden = models.BooleanField('скрыт модератором', default=False)
+
+    objects = VisibleQuerySet.as_manager()
 
     class Meta:
+        indexes = [
+            models.Index(
+                fields=['review', 'pub_date'],
+                condition=models.Q(is_hidden=False),
+                name='comment_visible_idx',
+            ),
+            models.Index(
+                fields=['author', 'pub_date'],
+                name='comment_author_date_idx',
+            ),
+        ]
         verbose_name = 'комментарий'
         verbose_name_plural = 'комментарии'
+
+    def __str__(self):
+        return self.text[:30]
+
+
+class ArchivedReview(models.Model):
+    """Архивный отзыв, перенесённый командой archive_content.
+
+    Сохраняет id исходного отзыва. Архив доступен только для чтения и
+    по-прежнему учитывается в агрегатах рейтинга произведения.
+    """
+
+    id = models.IntegerField(primary_key=True)
+    title = models.ForeignKey(
+        Title,
+        related_name='archived_reviews',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        verbose_name='произведение',
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_reviews',
+        verbose_name='автор',
+    )
+    text = models.TextField()
+    pub_date = models.DateTimeField('дата публикации')
+    score = models.IntegerField('оценка')
+    is_hidden = models.BooleanField('скрыт модератором', default=False)
+
+    objects = VisibleQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['author', 'title'],
+                name='unique_archived_review',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['title', 'pub_date'],
+                condition=models.Q(is_hidden=False),
+                name='archived_review_visible_idx',
+            ),
+        ]
+        ordering = ['pub_date']
+        verbose_name = 'архивный отзыв'
+        verbose_name_plural = 'архивные отзывы'
+
+    def __str__(self):
+        return self.text[:30]
+
+
+class ArchivedComment(models.Model):
+    """Архивный комментарий, перенесённый вместе со своим отзывом."""
+
+    id = models.IntegerField(primary_key=True)
+    review = models.ForeignKey(
+        ArchivedReview,
+        related_name='comments',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        verbose_name='отзыв',
+    )
+    author = models.ForeignKey(
+        'User',
+        related_name='archived_comments',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        verbose_name='автор',
+    )
+    text = models.TextField('текст',)
+    pub_date = models.DateTimeField('дата публикации')
+    is_hidden = models.BooleanField('скрыт модератором', default=False)
+
+    objects = VisibleQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['review', 'pub_date'],
+                condition=models.Q(is_hidden=False),
+                name='archived_comment_visible_idx',
+            ),
+        ]
+        verbose_name = 'архивный комментарий'
+        verbose_name_plural = 'архивные комментарии'
+
+    def __str__(self):
+        return self.text[:30]
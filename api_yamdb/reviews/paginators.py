@@ -0,0 +1,34 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор без точного COUNT(*) по большим таблицам.
+
+    Для списка без фильтров в PostgreSQL берётся оценка из pg_class, для
+    отфильтрованного списка строки считаются не дальше count_limit.
+    """
+
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = self.get_estimate(queryset)
+            if estimate is not None and estimate > self.count_limit:
+                return estimate
+        return queryset.order_by()[:self.count_limit].count()
+
+    def get_estimate(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row else None
@@ -0,0 +1,135 @@
+import time
+
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory
+
+from api_yamdb.db_router import (ReplicaPinningMiddleware, ReplicaRouter,
+                                 keep_replica_reads, replicas_allowed)
+from reviews.models import Title, User
+
+
+class TestReplicaRouter:
+
+    @pytest.fixture(autouse=True)
+    def replicas(self, settings):
+        settings.DATABASE_REPLICAS = ['replica_0']
+
+    def request_db(self, method, model, **headers):
+        router = ReplicaRouter()
+        used = []
+
+        def view(request):
+            used.append(router.db_for_read(model))
+            return None
+
+        middleware = ReplicaPinningMiddleware(view)
+        middleware(
+            getattr(RequestFactory(), method)('/api/v1/titles/', **headers)
+        )
+        return used[0]
+
+    def test_safe_requests_read_from_replica(self):
+        assert self.request_db('get', Title) == 'replica_0', (
+            'Проверьте, что GET-запросы к каталогу читают с реплики'
+        )
+
+    def test_unsafe_requests_read_from_primary(self):
+        assert self.request_db('post', Title) == 'default', (
+            'Проверьте, что изменяющие запросы читают из основной БД'
+        )
+
+    def test_cache_refresh_reads_from_primary(self, settings):
+        settings.NGINX_CACHE_REFRESH_TOKEN = 'secret'
+        assert self.request_db(
+            'get', Title, HTTP_X_CACHE_REFRESH='secret'
+        ) == 'default', (
+            'Проверьте, что обновление микрокеша nginx читает из основной '
+            'БД, а не с отстающей реплики'
+        )
+        assert self.request_db(
+            'get', Title, HTTP_X_CACHE_REFRESH='guess'
+        ) == 'replica_0', (
+            'Проверьте, что заголовок без верного секрета не влияет на '
+            'выбор базы'
+        )
+
+    def test_users_are_not_replicated(self):
+        assert self.request_db('get', User) == 'default', (
+            'Проверьте, что пользователи всегда читаются из основной БД'
+        )
+
+    def test_streamed_responses_read_from_replica(self):
+        used = []
+
+        def rows():
+            used.append(ReplicaRouter().db_for_read(Title))
+            yield b''
+
+        def view(request):
+            return StreamingHttpResponse(keep_replica_reads(rows()))
+
+        response = ReplicaPinningMiddleware(view)(
+            RequestFactory().get('/api/v1/titles/')
+        )
+        list(response.streaming_content)
+        assert used == ['replica_0'], (
+            'Проверьте, что потоковый ответ читает с реплики и после '
+            'выхода из ReplicaPinningMiddleware'
+        )
+        assert not replicas_allowed()
+
+    def test_replicas_are_off_outside_requests(self):
+        assert not replicas_allowed()
+        assert ReplicaRouter().db_for_read(Title) == 'default', (
+            'Проверьте, что вне запросов реплики не используются'
+        )
+
+
+class TestReplicaStickiness:
+
+    @pytest.fixture(autouse=True)
+    def replicas(self, settings):
+        settings.DATABASE_REPLICAS = ['replica_0']
+        settings.REPLICA_STICKY_SECONDS = 5
+        cache.clear()
+        yield
+        cache.clear()
+
+    def request_db(self, method, token):
+        router = ReplicaRouter()
+        used = []
+
+        def view(request):
+            used.append(router.db_for_read(Title))
+            return None
+
+        request = getattr(RequestFactory(), method)(
+            '/api/v1/titles/', HTTP_AUTHORIZATION=f'Bearer {token}'
+        )
+        ReplicaPinningMiddleware(view)(request)
+        return used[0]
+
+    def test_client_reads_from_primary_after_write(self):
+        assert self.request_db('get', 'first') == 'replica_0'
+        self.request_db('post', 'first')
+        assert self.request_db('get', 'first') == 'default', (
+            'Проверьте, что после записи клиент читает из основной БД'
+        )
+        assert self.request_db('get', 'second') == 'replica_0', (
+            'Проверьте, что закрепление действует только для автора записи'
+        )
+
+    def test_pin_expires(self, monkeypatch):
+        self.request_db('post', 'first')
+        now = time.time()
+        monkeypatch.setattr(
+            time, 'time',
+            lambda: now + settings.REPLICA_STICKY_SECONDS + 1,
+        )
+        assert self.request_db('get', 'first') == 'replica_0', (
+            'Проверьте, что закрепление за основной БД истекает через '
+            'REPLICA_STICKY_SECONDS'
+        )
@@ -0,0 +1,95 @@
+import json
+import tracemalloc
+from datetime import datetime, timezone
+
+import pytest
+from rest_framework.test import APIClient
+
+from api.fast_serializers import ReviewValuesSerializer
+from api.streaming import stream_json
+from reviews.models import Category, Title
+
+
+class TestStreamJson:
+
+    serializer = ReviewValuesSerializer()
+    envelope = {'count': 0, 'next': None, 'previous': None}
+
+    def rows(self, count):
+        now = datetime(2022, 1, 1, tzinfo=timezone.utc)
+        for pk in range(count):
+            yield (pk, 'Текст отзыва ' * 5, f'author{pk}', now, 7)
+
+    def peak_memory(self, count):
+        tracemalloc.start()
+        try:
+            for _ in stream_json(
+                self.envelope, self.rows(count), self.serializer, 500
+            ):
+                pass
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_output_is_valid_page(self):
+        content = b''.join(stream_json(
+            self.envelope, self.rows(1200), self.serializer, 500
+        ))
+        data = json.loads(content)
+        assert list(data) == ['count', 'next', 'previous', 'results']
+        assert len(data['results']) == 1200, (
+            'Проверьте, что потоковый ответ содержит все строки страницы'
+        )
+        assert data['results'][1]['author'] == 'author1'
+
+    def test_memory_does_not_grow_with_page_size(self):
+        small = self.peak_memory(1000)
+        large = self.peak_memory(100000)
+        assert large < small * 1.5, (
+            'Проверьте, что память на потоковый ответ не зависит '
+            'от размера страницы'
+        )
+
+
+@pytest.mark.django_db
+class TestStreamingListView:
+
+    url = '/api/v1/titles/?page_size=25'
+
+    @pytest.fixture(autouse=True)
+    def titles(self, settings):
+        settings.FAST_RENDERING = True
+        settings.STREAMING_CHUNK_SIZE = 4
+        category = Category.objects.create(name='Фильмы', slug='films')
+        Title.objects.bulk_create(
+            Title(name=f'Произведение {index:02}', year=2000 + index,
+                  category=category, reviews_count=2,
+                  score_total=index % 19 + 2)
+            for index in range(30)
+        )
+        Category.objects.bulk_create(
+            Category(name=f'Категория {index:02}', slug=f'category-{index}')
+            for index in range(30)
+        )
+
+    def test_streamed_page_matches_rendered_page(self, settings):
+        client = APIClient()
+        settings.STREAMING_PAGE_SIZE = 1000
+        rendered = client.get(self.url)
+        settings.STREAMING_PAGE_SIZE = 10
+        streamed = client.get(self.url)
+        assert not rendered.streaming and streamed.streaming, (
+            'Проверьте, что большие страницы отдаются потоком'
+        )
+        assert b''.join(streamed.streaming_content) == rendered.content, (
+            'Проверьте, что потоковый ответ совпадает с выводом '
+            'FastJSONRenderer байт в байт'
+        )
+
+    def test_materialized_pages_are_limited(self, settings):
+        settings.STREAMING_PAGE_SIZE = 10
+        response = APIClient().get('/api/v1/categories/?page_size=100000')
+        assert len(response.json()['results']) == 10, (
+            'Проверьте, что страницы без потоковой отдачи ограничены '
+            'STREAMING_PAGE_SIZE'
+        )
@@ -0,0 +1,149 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+from django.db import IntegrityError
+from django.db.models.signals import post_save
+from rest_framework.test import APIClient
+
+from api.write_buffer import WriteBuffer, comment_buffer, save_comments
+from reviews.models import Category, Comment, Review, Title, User
+
+
+class TestWriteBuffer:
+
+    def submit_all(self, buffer, items):
+        with ThreadPoolExecutor(len(items)) as executor:
+            futures = [executor.submit(buffer.submit, item) for item in items]
+        return futures
+
+    def test_results_are_returned_after_flush(self):
+        flushed = []
+        lock = threading.Lock()
+
+        def flush(items):
+            with lock:
+                flushed.extend(items)
+            return [(item, len(flushed)) for item in items]
+
+        buffer = WriteBuffer(flush, window=0.05, max_size=100)
+        futures = self.submit_all(buffer, list(range(20)))
+        for item, future in enumerate(futures):
+            result, flushed_count = future.result()
+            assert result == item
+            assert flushed_count > 0 and item in flushed[:flushed_count], (
+                'Проверьте, что запись подтверждается только после '
+                'сохранения её пачки'
+            )
+        assert sorted(flushed) == list(range(20))
+
+    def test_concurrent_writes_are_coalesced(self):
+        batches = []
+
+        def flush(items):
+            batches.append(items)
+            return items
+
+        buffer = WriteBuffer(flush, window=0.05, max_size=100)
+        self.submit_all(buffer, list(range(20)))
+        assert len(batches) < 20, (
+            'Проверьте, что параллельные записи сохраняются пачками'
+        )
+
+    def test_failed_batch_is_retried_per_item(self):
+        def flush(items):
+            if 'bad' in items:
+                raise ValueError('bad')
+            return items
+
+        buffer = WriteBuffer(flush, window=0.05, max_size=100)
+        futures = self.submit_all(buffer, ['a', 'bad', 'b'])
+        assert futures[0].result() == 'a'
+        assert futures[2].result() == 'b'
+        with pytest.raises(ValueError):
+            futures[1].result()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestCommentBuffer:
+
+    @pytest.fixture(autouse=True)
+    def review(self):
+        self.author = User.objects.create(
+            username='author', email='author@example.ru'
+        )
+        category = Category.objects.create(name='Фильмы', slug='films')
+        self.title = Title.objects.create(name='Фильм', category=category)
+        self.review = Review.objects.create(
+            title=self.title, author=self.author, text='Отзыв', score=7
+        )
+
+    def test_buffered_comments_are_stored(self, settings, monkeypatch):
+        settings.COMMENT_WRITE_BUFFER = True
+        submitted = []
+        submit = comment_buffer.submit
+        monkeypatch.setattr(
+            comment_buffer, 'submit',
+            lambda item: submitted.append(item) or submit(item),
+        )
+        client = APIClient()
+        client.force_authenticate(self.author)
+        url = (
+            f'/api/v1/titles/{self.title.pk}/reviews/'
+            f'{self.review.pk}/comments/'
+        )
+        responses = [
+            client.post(url, {'text': f'Комментарий {index}'})
+            for index in range(3)
+        ]
+        assert len(submitted) == 3, (
+            'Проверьте, что при COMMENT_WRITE_BUFFER комментарии '
+            'сохраняются через буфер'
+        )
+        for index, response in enumerate(responses):
+            assert response.status_code == 201
+            comment = Comment.objects.get(pk=response.json()['id'])
+            assert comment.text == f'Комментарий {index}', (
+                'Проверьте, что ответ содержит id сохранённого комментария'
+            )
+            assert comment.review_id == self.review.pk
+            assert comment.author_id == self.author.pk
+
+    def test_save_comments_sends_post_save(self):
+        saved = []
+
+        def receiver(sender, instance, created, **kwargs):
+            saved.append((instance.pk, created))
+
+        post_save.connect(receiver, sender=Comment)
+        try:
+            comments = save_comments([
+                Comment(review=self.review, author=self.author, text=text)
+                for text in ('Первый', 'Второй')
+            ])
+        finally:
+            post_save.disconnect(receiver, sender=Comment)
+        assert all(comment.pk for comment in comments)
+        assert saved == [(comment.pk, True) for comment in comments], (
+            'Проверьте, что для каждого комментария отправляется post_save'
+        )
+
+    def test_failed_batch_keeps_valid_comments(self):
+        buffer = WriteBuffer(save_comments, window=0.01, max_size=100)
+        comments = [
+            Comment(review=self.review, author=self.author, text='Первый'),
+            Comment(review=self.review, author_id=self.author.pk + 1000,
+                    text='Без автора'),
+            Comment(review=self.review, author=self.author, text='Второй'),
+        ]
+        futures = [Future() for _ in comments]
+        buffer.flush_batch(list(zip(comments, futures)))
+        with pytest.raises(IntegrityError):
+            futures[1].result()
+        stored = [futures[0].result().pk, futures[2].result().pk]
+        assert list(Comment.objects.order_by('pk').values_list(
+            'pk', 'text'
+        )) == [(stored[0], 'Первый'), (stored[1], 'Второй')], (
+            'Проверьте, что при ошибке пачки остальные комментарии '
+            'сохраняются по одному'
+        )